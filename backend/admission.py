@@ -0,0 +1,262 @@
+import asyncio
+import functools
+import ipaddress
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+import auth, database
+
+# Admission control in front of the API.
+#
+# 1. Token buckets per caller (user from the JWT, else client IP) and route class
+#    (read/write) reject floods early with 429 + Retry-After.
+# 2. A concurrency gate sized to the DB pool bounds how many database-bound
+#    requests run at once. Excess requests wait briefly, then get 503 +
+#    Retry-After instead of queueing on the pool until latency collapses.
+#
+# Admins and agents get larger buckets, slots reserved for them in the gate,
+# and precedence over other waiters, so staff keep working during a customer
+# surge. The role is read from the token's "role" claim (no DB lookup).
+#
+# Login and registration have no token yet. They get their own per-IP bucket sized
+# for login traffic and wait longer for a slot, so staff can still sign in during
+# a surge. Behind the tunnel every connection comes from the proxy, so the client
+# IP is taken from CLIENT_IP_HEADER (or X-Forwarded-For) when the peer is trusted.
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(database.POOL_SIZE + database.MAX_OVERFLOW)))
+RESERVED_SLOTS = int(os.getenv("ADMISSION_RESERVED_SLOTS", str(max(1, MAX_CONCURRENCY // 4))))
+QUEUE_TIMEOUT = {
+    "privileged": float(os.getenv("ADMISSION_PRIVILEGED_QUEUE_TIMEOUT", "5")),
+    "user": float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1")),
+    "anonymous": float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1")),
+    "auth": float(os.getenv("ADMISSION_PRIVILEGED_QUEUE_TIMEOUT", "5")),
+}
+MAX_BUCKETS = 100_000
+
+# (tokens per second, burst) per caller tier and route class
+RATE_LIMITS = {
+    "privileged": {"read": (20.0, 100), "write": (10.0, 50)},
+    "user": {"read": (5.0, 30), "write": (1.0, 10)},
+    "anonymous": {"read": (2.0, 20), "write": (0.5, 5), "auth": (1.0, 20)},
+}
+
+# Unauthenticated by nature: limited per client IP in the "auth" class
+AUTH_ROUTES = {("POST", "/users/token"), ("POST", "/users/"), ("POST", "/users")}
+
+# Peers allowed to report the client address. Only loopback by default: anyone else
+# who is trusted can mint a fresh bucket per request with a made-up header, so list
+# exactly the proxy addresses (docker-compose pins the tunnel's)
+CLIENT_IP_HEADER = os.getenv("ADMISSION_CLIENT_IP_HEADER", "cf-connecting-ip").lower().encode("latin-1")
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip())
+    for network in os.getenv("ADMISSION_TRUSTED_PROXIES", "127.0.0.1/32,::1/128").split(",")
+    if network.strip()
+]
+
+# Not database-bound: never limited
+EXEMPT_PATHS = {"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}
+# Rate limited but outside the gate: file downloads stream from disk after a single lookup
+GATE_EXEMPT = [re.compile(r"^/complaints/\d+/attachments/\d+$")]
+# Uploads hold no DB connection while the body streams in, so rather than a DB slot for
+# the whole transfer they take one of MAX_UPLOADS slots of their own
+UPLOAD_ROUTE = re.compile(r"^/complaints/\d+/attachments$")
+MAX_UPLOADS = int(os.getenv("ADMISSION_MAX_UPLOADS", "10"))
+
+PRIVILEGED_ROLES = {"admin", "agent"}
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Consume a token; returns seconds to wait before retrying, or 0 if admitted"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class RateLimiter:
+    def __init__(self, limits: dict, max_buckets: int = MAX_BUCKETS):
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self.buckets = OrderedDict()
+
+    def check(self, caller: str, tier: str, route_class: str):
+        key = (caller, route_class)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(*self.limits[tier][route_class])
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket.take()
+
+class PriorityGate:
+    """Bounded concurrency with slots reserved for, and precedence given to, privileged callers"""
+
+    def __init__(self, limit: int, reserved: int):
+        self.limit = limit
+        self.reserved = min(reserved, limit - 1)
+        self.in_flight = 0
+        self.privileged_waiting = 0
+        self.condition = asyncio.Condition()
+
+    def _can_enter(self, privileged: bool):
+        if privileged:
+            return self.in_flight < self.limit
+        return self.in_flight < self.limit - self.reserved and self.privileged_waiting == 0
+
+    async def acquire(self, privileged: bool, timeout: float):
+        """Returns True once admitted, False if no slot freed up within the timeout"""
+        async with self.condition:
+            if self._can_enter(privileged):
+                self.in_flight += 1
+                return True
+            if privileged:
+                self.privileged_waiting += 1
+            try:
+                await asyncio.wait_for(self.condition.wait_for(lambda: self._can_enter(privileged)), timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                if privileged:
+                    self.privileged_waiting -= 1
+            self.in_flight += 1
+            return True
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+@functools.lru_cache(maxsize=4096)
+def _is_trusted_proxy(address: str):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def _client_ip(scope):
+    """The client address, as reported by a trusted proxy in front of us if there is one"""
+    client = scope.get("client")
+    peer = client[0] if client else None
+    if peer is None or not _is_trusted_proxy(peer):
+        return peer or "unknown"
+    forwarded_for = None
+    for name, value in scope["headers"]:
+        if name == CLIENT_IP_HEADER:
+            return value.decode("latin-1").strip() or peer
+        if name == b"x-forwarded-for":
+            forwarded_for = value.decode("latin-1")
+    if forwarded_for:
+        # Rightmost hop not added by one of our own proxies
+        for address in reversed([hop.strip() for hop in forwarded_for.split(",")]):
+            if address and not _is_trusted_proxy(address):
+                return address
+    return peer
+
+def _caller(scope):
+    """(caller key, tier) from the bearer token if it is valid, else the client IP"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                from jose import JWTError, jwt
+                try:
+                    payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+                except JWTError:
+                    break
+                if payload.get("sub"):
+                    tier = "privileged" if payload.get("role") in PRIVILEGED_ROLES else "user"
+                    return f"user:{payload['sub']}", tier
+            break
+    return f"ip:{_client_ip(scope)}", "anonymous"
+
+async def _reject(send, status_code: int, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.limiter = RateLimiter(RATE_LIMITS)
+        self.gate = PriorityGate(MAX_CONCURRENCY, RESERVED_SLOTS)
+        self.upload_gate = PriorityGate(MAX_UPLOADS, 0)
+        self.rate_limited = 0
+        self.shed = 0
+        admission_stats.append(self.stats)
+
+    def stats(self):
+        return {
+            "in_flight": self.gate.in_flight,
+            "limit": self.gate.limit,
+            "reserved_for_privileged": self.gate.reserved,
+            "uploads_in_flight": self.upload_gate.in_flight,
+            "upload_limit": self.upload_gate.limit,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not ADMISSION_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if (scope["method"], scope["path"]) in AUTH_ROUTES:
+            caller, tier, route_class = f"ip:{_client_ip(scope)}", "anonymous", "auth"
+        else:
+            caller, tier = _caller(scope)
+            route_class = "write" if scope["method"] in WRITE_METHODS else "read"
+        retry_after = self.limiter.check(caller, tier, route_class)
+        if retry_after:
+            self.rate_limited += 1
+            await _reject(send, 429, retry_after, "Too many requests")
+            return
+
+        if any(pattern.match(scope["path"]) for pattern in GATE_EXEMPT):
+            await self.app(scope, receive, send)
+            return
+
+        privileged = tier == "privileged"
+        timeout = QUEUE_TIMEOUT["auth" if route_class == "auth" else tier]
+        gate = self.upload_gate if scope["method"] == "POST" and UPLOAD_ROUTE.match(scope["path"]) else self.gate
+        if not await gate.acquire(privileged, timeout):
+            self.shed += 1
+            await _reject(send, 503, timeout, "Server busy, please retry")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await gate.release()
+
+# Stats callbacks of installed middleware instances, for /metrics
+admission_stats = []
@@ -0,0 +1,156 @@
+import heapq
+import os
+import time
+from collections import defaultdict
+from sqlalchemy import select, update, exists, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+import models
+
+# Automatic assignment of new complaints to the least loaded active agent.
+#
+# Each worker keeps a min-heap of (open complaints, agent id), plus one heap per
+# tag for agents skilled in it. Heaps use lazy deletion: a changed load pushes a
+# fresh entry and stale ones are dropped when they reach the top, so assigning is
+# O(log n). The heaps are seeded from an aggregate over complaints and reseeded
+# every RESEED_SECONDS to absorb assignments made by other workers. The assignment
+# itself is a compare-and-set in the database, so two workers can never assign the
+# same complaint and an agent deactivated elsewhere is never picked.
+
+AUTO_ASSIGN_ENABLED = os.getenv("AUTO_ASSIGN_ENABLED", "1") == "1"
+# With strict skills, complaints whose tags no agent covers stay unassigned
+STRICT_SKILLS = os.getenv("ASSIGNMENT_STRICT_SKILLS", "0") == "1"
+RESEED_SECONDS = int(os.getenv("ASSIGNMENT_RESEED_SECONDS", "60"))
+MAX_CAS_ATTEMPTS = 3
+
+RESOLVED = models.ComplaintStatus.RESOLVED.value
+
+def _value(value):
+    return getattr(value, "value", value)
+
+class LoadBalancedAssigner:
+    def __init__(self):
+        self.reset({}, {})
+        self.loaded_at = None
+
+    def reset(self, loads: dict, skills: dict):
+        """Replace all state: loads maps agent id -> open complaints, skills agent id -> tag ids"""
+        self.load = dict(loads)
+        self.skills = {agent_id: set(skills.get(agent_id, ())) for agent_id in self.load}
+        self.heap = [(load, agent_id) for agent_id, load in self.load.items()]
+        heapq.heapify(self.heap)
+        self.tag_heaps = defaultdict(list)
+        for agent_id, tag_ids in self.skills.items():
+            for tag_id in tag_ids:
+                self.tag_heaps[tag_id].append((self.load[agent_id], agent_id))
+        for heap in self.tag_heaps.values():
+            heapq.heapify(heap)
+
+    def _push(self, agent_id: int):
+        entry = (self.load[agent_id], agent_id)
+        heapq.heappush(self.heap, entry)
+        for tag_id in self.skills[agent_id]:
+            heapq.heappush(self.tag_heaps[tag_id], entry)
+        # Lazy deletion leaves stale entries behind; rebuild once they dominate
+        if len(self.heap) > 4 * len(self.load) + 64:
+            self.reset(self.load, self.skills)
+
+    def _top(self, heap):
+        while heap:
+            load, agent_id = heap[0]
+            if self.load.get(agent_id) == load:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def pick(self, tag_ids=()):
+        """Least loaded agent, preferring agents skilled in one of the tags; None if nobody fits"""
+        candidates = [self._top(self.tag_heaps[tag_id]) for tag_id in tag_ids if tag_id in self.tag_heaps]
+        candidates = [entry for entry in candidates if entry is not None]
+        if candidates:
+            return min(candidates)[1]
+        if tag_ids and STRICT_SKILLS:
+            return None
+        top = self._top(self.heap)
+        return top[1] if top else None
+
+    def adjust(self, agent_id: int, delta: int):
+        if agent_id in self.load:
+            self.load[agent_id] = max(self.load[agent_id] + delta, 0)
+            self._push(agent_id)
+
+    def remove(self, agent_id: int):
+        """Drop an agent; their heap entries become stale"""
+        self.load.pop(agent_id, None)
+        self.skills.pop(agent_id, None)
+
+    def on_complaint_changed(self, old_assignee, old_status, new_assignee, new_status):
+        """Apply an assignment/status transition to agent loads"""
+        old_agent = old_assignee if _value(old_status) != RESOLVED else None
+        new_agent = new_assignee if _value(new_status) != RESOLVED else None
+        if old_agent != new_agent:
+            if old_agent is not None:
+                self.adjust(old_agent, -1)
+            if new_agent is not None:
+                self.adjust(new_agent, 1)
+
+    def invalidate(self):
+        """Force a reseed on next use (agent set or skills changed)"""
+        self.loaded_at = None
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < RESEED_SECONDS:
+            return
+        open_count = func.count(models.Complaint.id)
+        result = await db.execute(
+            select(models.User.id, open_count)
+            .outerjoin(models.Complaint, and_(
+                models.Complaint.assigned_to_id == models.User.id,
+                models.Complaint.status != RESOLVED,
+            ))
+            .where(models.User.is_active.is_(True), models.User.role == models.UserRole.AGENT.value)
+            .group_by(models.User.id)
+        )
+        loads = dict(result.all())
+        skills = defaultdict(set)
+        result = await db.execute(
+            select(models.agent_skills.c.user_id, models.agent_skills.c.tag_id)
+            .where(models.agent_skills.c.user_id.in_(loads))
+        )
+        for agent_id, tag_id in result.all():
+            skills[agent_id].add(tag_id)
+        self.reset(loads, skills)
+        self.loaded_at = time.monotonic()
+
+assigner = LoadBalancedAssigner()
+
+async def auto_assign(db: AsyncSession, complaint: models.Complaint):
+    """Assign an unassigned complaint to the least loaded agent; caller commits. Returns the agent id or None."""
+    if not AUTO_ASSIGN_ENABLED or complaint.assigned_to_id is not None:
+        return None
+    await assigner.ensure_loaded(db)
+
+    tag_ids = [tag.id for tag in complaint.tags]
+    for _ in range(MAX_CAS_ATTEMPTS):
+        agent_id = assigner.pick(tag_ids)
+        if agent_id is None:
+            return None
+        agent_is_active = exists().where(
+            models.User.id == agent_id,
+            models.User.is_active.is_(True),
+            models.User.role == models.UserRole.AGENT.value,
+        )
+        result = await db.execute(
+            update(models.Complaint)
+            .where(models.Complaint.id == complaint.id, models.Complaint.assigned_to_id.is_(None), agent_is_active)
+            .values(assigned_to_id=agent_id)
+            .returning(models.Complaint.id)
+            .execution_options(synchronize_session=False)
+        )
+        if result.first() is not None:
+            set_committed_value(complaint, "assigned_to_id", agent_id)
+            assigner.adjust(agent_id, 1)
+            return agent_id
+        # Agent no longer eligible (changed by another worker); forget them and retry
+        assigner.remove(agent_id)
+    return None
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import re
+import uuid
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+import multipart
+from multipart.multipart import parse_options_header
+
+# Blobs are content-addressed (sha256) so identical uploads share one file on disk
+ATTACHMENTS_DIR = os.getenv("ATTACHMENTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "attachments"))
+MAX_ATTACHMENT_BYTES = int(os.getenv("MAX_ATTACHMENT_BYTES", str(100 * 1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_FIELD = "file"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def blob_path(sha256: str):
+    return os.path.join(ATTACHMENTS_DIR, sha256[:2], sha256)
+
+# Storing and removing a blob happen under a transaction-level advisory lock on its
+# hash (see crud), together with the row insert/delete and reference check, so a
+# delete can't unlink a blob that a concurrent upload of the same content reuses.
+BLOB_LOCK_NAMESPACE = 290001
+
+def blob_lock_key(sha256: str):
+    """Second key of pg_advisory_xact_lock(BLOB_LOCK_NAMESPACE, key): 32 bits of the hash"""
+    return int(sha256[:8], 16) - 2**31
+
+def _temp_path():
+    tmp_dir = os.path.join(ATTACHMENTS_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    return os.path.join(tmp_dir, uuid.uuid4().hex)
+
+def _open_temp_file():
+    path = _temp_path()
+    return path, open(path, "wb")
+
+def discard_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def store_blob(tmp_path: str, sha256: str):
+    """Move an uploaded temp file into place, or drop it if the blob already exists. Call under the blob lock."""
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+
+def detach_blob(sha256: str):
+    """Move a blob out of place, returning where it went (None if missing). Call under the blob lock."""
+    detached = _temp_path()
+    try:
+        os.replace(blob_path(sha256), detached)
+    except FileNotFoundError:
+        return None
+    return detached
+
+def restore_blob(detached: str, sha256: str):
+    """Undo detach_blob"""
+    os.replace(detached, blob_path(sha256))
+
+class _UploadState:
+    """multipart parser callbacks; file bytes are queued and written by the caller"""
+
+    def __init__(self):
+        self.header_field = b""
+        self.header_value = b""
+        self.headers = {}
+        self.in_file_part = False
+        self.seen_file = False
+        self.filename = None
+        self.content_type = None
+        self.pending = []
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data, start, end):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        self.in_file_part = name == UPLOAD_FIELD and b"filename" in options and not self.seen_file
+        if self.in_file_part:
+            self.seen_file = True
+            self.filename = os.path.basename(options[b"filename"].decode("utf-8", "replace")) or "attachment"
+            self.content_type = self.headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+
+    def on_part_data(self, data, start, end):
+        if self.in_file_part:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self):
+        self.in_file_part = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+async def receive_upload(request: Request):
+    """Stream the `file` field of a multipart request to disk while hashing it.
+
+    Only one network chunk is held in memory at a time, whatever the file size.
+    Returns filename, content_type, size, sha256 and tmp_path; crud.create_attachment
+    moves the temp file into place.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    state = _UploadState()
+    parser = multipart.MultipartParser(options[b"boundary"], state.callbacks())
+    hasher = hashlib.sha256()
+    size = 0
+    tmp_path, tmp_file = await run_in_threadpool(_open_temp_file)
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if not state.pending:
+                continue
+            data = b"".join(state.pending)
+            state.pending.clear()
+            size += len(data)
+            if size > MAX_ATTACHMENT_BYTES:
+                raise HTTPException(status_code=413, detail="Attachment too large")
+            hasher.update(data)
+            await run_in_threadpool(tmp_file.write, data)
+        parser.finalize()
+        await run_in_threadpool(tmp_file.close)
+
+        if not state.seen_file:
+            raise HTTPException(status_code=400, detail=f"Missing '{UPLOAD_FIELD}' file field")
+
+        sha256 = hasher.hexdigest()
+    except BaseException:
+        tmp_file.close()
+        discard_file(tmp_path)
+        raise
+
+    return {
+        "filename": state.filename,
+        "content_type": state.content_type,
+        "size": size,
+        "sha256": sha256,
+        "tmp_path": tmp_path,
+    }
+
+def _iter_file_range(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def _parse_range(range_header: str, size: int):
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:  # suffix range: last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+def file_response(attachment, range_header: str = None):
+    """Serve a stored blob, honouring a single HTTP Range if requested"""
+    path = blob_path(attachment.sha256)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Attachment file missing")
+
+    size = os.path.getsize(path)
+    if not range_header:
+        # Starlette streams the file in chunks from disk without reading it into memory
+        return FileResponse(
+            path,
+            media_type=attachment.content_type,
+            filename=attachment.filename,
+            headers={"Accept-Ranges": "bytes"},
+        )
+
+    byte_range = _parse_range(range_header, size)
+    if byte_range is None:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    start, end = byte_range
+    length = end - start + 1
+    return StreamingResponse(
+        _iter_file_range(path, start, length),
+        status_code=206,
+        media_type=attachment.content_type,
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(length),
+        },
+    )
@@ -0,0 +1,59 @@
+import asyncio
+from sqlalchemy import text
+from database import engine
+
+async def backfill_rollups():
+    """Rebuild the daily reporting rollups from complaint history.
+
+    Runs in one transaction holding an exclusive lock on the rollup tables, so
+    write-path increments made meanwhile wait and are applied on top afterwards.
+    Like the write path (see rollups.py), every count is attributed to each
+    complaint's current priority and tags, so a rebuild matches the live counters.
+    resolved_at of complaints resolved before it existed is estimated by migration 0005.
+    """
+    async with engine.begin() as conn:
+        print("Backfilling reporting rollups...")
+
+        await conn.execute(text("LOCK TABLE daily_complaint_stats, daily_tag_stats IN EXCLUSIVE MODE"))
+
+        await conn.execute(text("DELETE FROM daily_complaint_stats"))
+        await conn.execute(text("DELETE FROM daily_tag_stats"))
+
+        await conn.execute(text("""
+            INSERT INTO daily_complaint_stats (day, priority, created_count, resolved_count, resolve_seconds_total)
+            SELECT day, priority, SUM(created_count), SUM(resolved_count), SUM(resolve_seconds_total)
+            FROM (
+                SELECT (created_at AT TIME ZONE 'UTC')::date AS day, priority,
+                       1 AS created_count, 0 AS resolved_count, 0::float AS resolve_seconds_total
+                FROM complaints
+                UNION ALL
+                SELECT (resolved_at AT TIME ZONE 'UTC')::date, priority,
+                       0, 1, EXTRACT(EPOCH FROM resolved_at - created_at)
+                FROM complaints
+                WHERE status = 'resolved' AND resolved_at IS NOT NULL
+            ) events
+            GROUP BY day, priority;
+        """))
+        print("✓ Rebuilt daily_complaint_stats")
+
+        await conn.execute(text("""
+            INSERT INTO daily_tag_stats (day, tag_id, created_count, resolved_count, resolve_seconds_total)
+            SELECT day, tag_id, SUM(created_count), SUM(resolved_count), SUM(resolve_seconds_total)
+            FROM (
+                SELECT (c.created_at AT TIME ZONE 'UTC')::date AS day, ct.tag_id,
+                       1 AS created_count, 0 AS resolved_count, 0::float AS resolve_seconds_total
+                FROM complaints c JOIN complaint_tags ct ON ct.complaint_id = c.id
+                UNION ALL
+                SELECT (c.resolved_at AT TIME ZONE 'UTC')::date, ct.tag_id,
+                       0, 1, EXTRACT(EPOCH FROM c.resolved_at - c.created_at)
+                FROM complaints c JOIN complaint_tags ct ON ct.complaint_id = c.id
+                WHERE c.status = 'resolved' AND c.resolved_at IS NOT NULL
+            ) events
+            GROUP BY day, tag_id;
+        """))
+        print("✓ Rebuilt daily_tag_stats")
+
+        print("\n✅ Rollup backfill completed successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(backfill_rollups())
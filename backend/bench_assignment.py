@@ -0,0 +1,58 @@
+import random
+import statistics
+import sys
+import time
+from assignment import LoadBalancedAssigner
+
+# Simulates auto-assignment with many agents and bursty arrivals, using the same
+# in-memory heaps as the API (the database compare-and-set is not simulated).
+# Usage: python bench_assignment.py [agents] [ticks]
+
+NUM_TAGS = 50
+
+def main():
+    agents = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(7)
+
+    skills = {
+        agent_id: set(rng.sample(range(NUM_TAGS), rng.randint(0, 3)))
+        for agent_id in range(agents)
+    }
+    assigner = LoadBalancedAssigner()
+    assigner.reset({agent_id: 0 for agent_id in range(agents)}, skills)
+
+    open_complaints = []
+    latencies = []
+    for tick in range(ticks):
+        # Steady trickle with an occasional outage-style burst
+        arrivals = rng.randint(50, 150) if rng.random() > 0.05 else rng.randint(5_000, 20_000)
+        for _ in range(arrivals):
+            tag_ids = rng.sample(range(NUM_TAGS), rng.randint(0, 2))
+            start = time.perf_counter()
+            agent_id = assigner.pick(tag_ids)
+            if agent_id is not None:
+                assigner.adjust(agent_id, 1)
+            latencies.append(time.perf_counter() - start)
+            if agent_id is not None:
+                open_complaints.append(agent_id)
+
+        # Agents resolve a share of the open work every tick
+        rng.shuffle(open_complaints)
+        resolved = len(open_complaints) // 10
+        for agent_id in open_complaints[:resolved]:
+            assigner.on_complaint_changed(agent_id, "open", agent_id, "resolved")
+        del open_complaints[:resolved]
+
+    latencies.sort()
+    loads = list(assigner.load.values())
+    print(f"{agents} agents, {len(latencies)} assignments over {ticks} ticks")
+    print(f"assign latency p50 {latencies[len(latencies) // 2] * 1e6:.1f} us  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us  "
+          f"throughput {len(latencies) / sum(latencies):,.0f}/s")
+    print(f"open per agent: min {min(loads)}  max {max(loads)}  "
+          f"mean {statistics.mean(loads):.2f}  stdev {statistics.pstdev(loads):.2f}")
+    print(f"heap entries: {len(assigner.heap)} (agents {len(assigner.load)})")
+
+if __name__ == "__main__":
+    main()
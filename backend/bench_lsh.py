@@ -0,0 +1,63 @@
+import random
+import sys
+import time
+from collections import defaultdict
+import similarity
+
+# Benchmarks the near-duplicate index on synthetic complaints using the same
+# MinHash/banding as the API, with an in-memory stand-in for complaint_lsh_buckets.
+# Usage: python bench_lsh.py [num_complaints] [num_queries]
+
+VOCABULARY = [f"w{i}" for i in range(5000)]
+TOPICS = ["billing", "login", "delivery", "refund", "password", "invoice", "crash", "payment", "account", "order"]
+
+def make_complaint(rng):
+    words = rng.choices(VOCABULARY, k=rng.randint(15, 40))
+    title = f"{rng.choice(TOPICS)} issue {rng.choice(VOCABULARY)}"
+    return title, " ".join(words)
+
+def near_duplicate(rng, title, description):
+    words = description.split()
+    for _ in range(max(1, len(words) // 10)):
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    return title, " ".join(words)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(1)
+
+    index = defaultdict(list)
+    docs = []
+    start = time.perf_counter()
+    for complaint_id in range(n):
+        title, description = make_complaint(rng)
+        docs.append((title, description))
+        for band, bucket in enumerate(similarity.complaint_buckets(title, description)):
+            index[(band, bucket)].append(complaint_id)
+    build = time.perf_counter() - start
+    print(f"indexed {n} complaints in {build:.1f}s ({build / n * 1e6:.0f} us/complaint)")
+
+    latencies = []
+    candidates = []
+    hits = 0
+    for _ in range(queries):
+        target = rng.randrange(n)
+        title, description = near_duplicate(rng, *docs[target])
+        t = time.perf_counter()
+        shared = defaultdict(int)
+        for band, bucket in enumerate(similarity.complaint_buckets(title, description)):
+            for complaint_id in index.get((band, bucket), ()):
+                shared[complaint_id] += 1
+        top = sorted((c for c in shared.items() if c[1] >= similarity.MIN_SHARED_BANDS), key=lambda c: -c[1])[:similarity.DEFAULT_LIMIT]
+        latencies.append(time.perf_counter() - t)
+        candidates.append(len(shared))
+        hits += any(complaint_id == target for complaint_id, _ in top)
+
+    latencies.sort()
+    print(f"queries: {queries}  recall@{similarity.DEFAULT_LIMIT}: {hits / queries:.3f}")
+    print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"candidates touched: avg {sum(candidates) / queries:.1f} of {n}")
+
+if __name__ == "__main__":
+    main()
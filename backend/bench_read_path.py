@@ -0,0 +1,56 @@
+import asyncio
+import sys
+import time
+import tracemalloc
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from database import AsyncSessionLocal
+import models, schemas, crud
+
+# Compares CPU time and peak allocated memory per complaint list page: the previous ORM
+# path (identity-mapped objects + selectinload, read back attribute by attribute)
+# against crud.get_complaints' Core rows with tags aggregated in SQL.
+# Needs a populated database. Usage: python bench_read_path.py [page_size] [pages]
+
+adapter = TypeAdapter(List[schemas.Complaint])
+
+async def orm_page(db, limit):
+    result = await db.execute(
+        select(models.Complaint)
+        .options(selectinload(models.Complaint.tags))
+        .limit(limit)
+        .order_by(models.Complaint.created_at.desc())
+    )
+    return result.scalars().all()
+
+async def core_page(db, limit):
+    return await crud.get_complaints(db, limit=limit)
+
+async def measure(name, fetch, limit, pages):
+    async with AsyncSessionLocal() as db:
+        adapter.dump_json(adapter.validate_python(await fetch(db, limit), from_attributes=True))  # warm up
+
+        cpu = 0.0
+        tracemalloc.start()
+        for _ in range(pages):
+            db.expunge_all()
+            start = time.process_time()
+            rows = await fetch(db, limit)
+            adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+            cpu += time.process_time() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{name:<5} {len(rows):>5} rows/page  cpu {cpu / pages * 1000:8.2f} ms/page  "
+          f"peak allocated {peak / 1024:8.0f} KiB")
+
+async def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    await measure("orm", orm_page, limit, pages)
+    await measure("core", core_page, limit, pages)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Measures API cold start: how long `import main` takes in a fresh interpreter,
+# and how long a fresh uvicorn process takes to answer its first request.
+# Usage: python bench_startup.py [runs]
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+
+def measure_import():
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def measure_first_response(timeout: float = 30.0):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=HERE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("API did not respond in time")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    imports = [measure_import() for _ in range(runs)]
+    firsts = [measure_first_response() for _ in range(runs)]
+    print(f"import main:         min {min(imports) * 1000:.1f} ms  avg {sum(imports) / runs * 1000:.1f} ms")
+    print(f"time to first reply: min {min(firsts) * 1000:.1f} ms  avg {sum(firsts) / runs * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
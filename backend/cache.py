@@ -0,0 +1,170 @@
+import os
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+import database
+
+# Result cache for complaint list pages.
+#
+# Entries are keyed by (generation, normalized query). Every complaint/tag write
+# bumps the generation after committing, which makes all older entries
+# unreachable, so a page is never served from before the last write.
+#
+# The generation counter is always shared by every worker: in redis when
+# CACHE_REDIS_URL is set, otherwise in a Postgres sequence read once per cached
+# request. Entries live in redis or, by default, in each worker's memory; a
+# worker drops its local entries as soon as it sees a newer generation, so a
+# write through any worker invalidates all of them.
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+class PostgresGeneration:
+    """Generation counter shared through a sequence: nextval never blocks and isn't rolled back"""
+
+    SEQUENCE = "complaint_list_generation"
+
+    async def get(self):
+        async with database.engine.connect() as conn:
+            return (await conn.execute(
+                text(f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {self.SEQUENCE}")
+            )).scalar()
+
+    async def bump(self):
+        async with database.engine.connect() as conn:
+            await conn.execute(text(f"SELECT nextval('{self.SEQUENCE}')"))
+
+class LocalBackend:
+    """Bounded LRU (by entry count and total bytes) in process memory, with a shared generation"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: int, generation_source):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation_source = generation_source
+        self.entries = OrderedDict()
+        self.size = 0
+        self.generation = None
+
+    async def get_generation(self):
+        generation = await self.generation_source.get()
+        if generation != self.generation:
+            # Everything cached so far belongs to an older generation
+            self.generation = generation
+            self.entries.clear()
+            self.size = 0
+        return generation
+
+    async def bump_generation(self):
+        await self.generation_source.bump()
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.size += len(value)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        _, value = self.entries.pop(key)
+        self.size -= len(value)
+
+class RedisBackend:
+    """Shared backend; redis' own maxmemory/LRU policy bounds memory"""
+
+    GENERATION_KEY = "complaints:list:generation"
+
+    def __init__(self, url: str, ttl: int):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_REDIS_URL is set but the 'redis' package is not installed")
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+
+    async def get_generation(self):
+        return int(await self.client.get(self.GENERATION_KEY) or 0)
+
+    async def bump_generation(self):
+        await self.client.incr(self.GENERATION_KEY)
+
+    async def get(self, key):
+        return await self.client.get(f"complaints:list:{key[0]}:{key[1]}")
+
+    async def set(self, key, value: bytes):
+        await self.client.set(f"complaints:list:{key[0]}:{key[1]}", value, ex=self.ttl)
+
+class QueryCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def generation(self):
+        """Read before running the query; store the result under this generation"""
+        return await self.backend.get_generation()
+
+    async def get(self, generation: int, key: str):
+        value = await self.backend.get((generation, key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, generation: int, key: str, value: bytes):
+        await self.backend.set((generation, key), value)
+
+    async def invalidate(self):
+        self.invalidations += 1
+        await self.backend.bump_generation()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": "redis" if isinstance(self.backend, RedisBackend) else "local",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(self.backend, LocalBackend):
+            stats.update(entries=len(self.backend.entries), bytes=self.backend.size)
+        return stats
+
+def list_key(**params):
+    """Cache key for a complaint list query.
+
+    Values are used verbatim: status/priority filters are exact matches and search
+    keeps its whitespace, so only None and "" (both "no filter") share a key.
+    """
+    return "&".join(f"{name}={'' if params[name] is None else params[name]}" for name in sorted(params))
+
+def _make_backend():
+    if CACHE_REDIS_URL:
+        return RedisBackend(CACHE_REDIS_URL, CACHE_TTL_SECONDS)
+    return LocalBackend(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL_SECONDS, PostgresGeneration())
+
+complaint_list_cache = QueryCache(_make_backend())
+
+async def invalidate_complaint_lists():
+    """Call after committing any write that can change a complaint list page"""
+    await complaint_list_cache.invalidate()
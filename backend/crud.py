@@ -1,8 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update
-from sqlalchemy.orm import selectinload
-import models, schemas, auth
+from sqlalchemy import update, delete, insert, func, tuple_, literal, literal_column, text, Integer, String, JSON
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import selectinload, with_parent
+from datetime import datetime, timezone
+from fastapi.concurrency import run_in_threadpool
+import base64
+import models, schemas, auth, similarity, rollups, cache, saved_searches, assignment, user_directory, sla, attachments
+
+def _enum_value(value):
+    return getattr(value, "value", value)
 
 async def get_user(db: AsyncSession, user_id: int):
     result = await db.execute(select(models.User).where(models.User.id == user_id))
@@ -18,10 +25,31 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate):
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    user_directory.username_index.sync(db_user)
     return db_user
 
+# List endpoints read plain rows through SQLAlchemy Core: no identity map or
+# attribute instrumentation, and tags are aggregated to JSON in SQL.
+_tags_json = (
+    select(func.coalesce(
+        func.json_agg(func.json_build_object(
+            literal_column("'id'"), models.Tag.id,
+            literal_column("'name'"), models.Tag.name,
+            literal_column("'color'"), models.Tag.color,
+            literal_column("'created_at'"), models.Tag.created_at,
+        )),
+        literal_column("'[]'::json"),
+        type_=JSON,
+    ))
+    .select_from(models.complaint_tags.join(models.Tag, models.Tag.id == models.complaint_tags.c.tag_id))
+    .where(models.complaint_tags.c.complaint_id == models.Complaint.id)
+    .correlate(models.Complaint)
+    .scalar_subquery()
+    .label("tags")
+)
+
 async def get_complaints(db: AsyncSession, skip: int = 0, limit: int = 100, search: str = None, status: str = None, priority: str = None, tag_id: int = None):
-    query = select(models.Complaint).options(selectinload(models.Complaint.tags))
+    query = select(*models.Complaint.__table__.c, _tags_json)
     
     if search:
         search_filter = f"%{search}%"
@@ -37,11 +65,48 @@ async def get_complaints(db: AsyncSession, skip: int = 0, limit: int = 100, sear
         query = query.where(models.Complaint.priority == priority)
     
     if tag_id:
-        query = query.join(models.Complaint.tags).where(models.Tag.id == tag_id)
+        query = query.where(models.Complaint.id.in_(
+            select(models.complaint_tags.c.complaint_id).where(models.complaint_tags.c.tag_id == tag_id)
+        ))
         
     query = query.offset(skip).limit(limit).order_by(models.Complaint.created_at.desc())
     result = await db.execute(query)
-    return result.scalars().all()
+    return [dict(row) for row in result.mappings()]
+
+def encode_queue_cursor(complaint: models.Complaint):
+    raw = f"{complaint.created_at.isoformat()}|{complaint.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_queue_cursor(cursor: str):
+    created_at, complaint_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(complaint_id)
+
+async def get_complaint_queue(db: AsyncSession, user: models.User, relationship, status: str = None, limit: int = 50, cursor: str = None):
+    """One page of a user's queue (newest first, keyset paged) plus per-status counts.
+
+    `relationship` is User.complaints_assigned or User.complaints_created.
+    """
+    criteria = with_parent(user, relationship)
+
+    query = select(models.Complaint).options(selectinload(models.Complaint.tags)).where(criteria)
+    if status:
+        query = query.where(models.Complaint.status == status)
+    if cursor:
+        created_at, complaint_id = decode_queue_cursor(cursor)
+        query = query.where(tuple_(models.Complaint.created_at, models.Complaint.id) < (created_at, complaint_id))
+    query = query.order_by(models.Complaint.created_at.desc(), models.Complaint.id.desc()).limit(limit + 1)
+    items = (await db.execute(query)).scalars().all()
+
+    counts_result = await db.execute(
+        select(models.Complaint.status, func.count())
+        .where(criteria)
+        .group_by(models.Complaint.status)
+    )
+    counts = {member.value: 0 for member in models.ComplaintStatus}
+    counts.update({row_status: count for row_status, count in counts_result.all()})
+
+    next_cursor = encode_queue_cursor(items[limit - 1]) if len(items) > limit else None
+    return {"items": items[:limit], "counts": counts, "next_cursor": next_cursor}
 
 async def get_complaint(db: AsyncSession, complaint_id: int):
     result = await db.execute(
@@ -51,9 +116,39 @@ async def get_complaint(db: AsyncSession, complaint_id: int):
     )
     return result.scalars().first()
 
+async def get_complaint_detail(db: AsyncSession, complaint_id: int):
+    """Complaint with tags, comments (with authors) and audit logs in a fixed number of queries"""
+    result = await db.execute(
+        select(models.Complaint)
+        .options(
+            selectinload(models.Complaint.tags),
+            selectinload(models.Complaint.comments).selectinload(models.Comment.user),
+            selectinload(models.Complaint.audit_logs),
+        )
+        .where(models.Complaint.id == complaint_id)
+    )
+    db_complaint = result.scalars().first()
+    if not db_complaint:
+        return None
+
+    # Same newest-first order as the standalone comments/audit-logs endpoints
+    db_complaint.comments.sort(key=lambda comment: comment.created_at, reverse=True)
+    db_complaint.audit_logs.sort(key=lambda log: log.timestamp, reverse=True)
+    return db_complaint
+
+async def get_complaints_by_ids(db: AsyncSession, complaint_ids: list):
+    """Load many complaints with one IN query; returned in the requested order, missing ids skipped"""
+    result = await db.execute(
+        select(models.Complaint)
+        .options(selectinload(models.Complaint.tags))
+        .where(models.Complaint.id.in_(complaint_ids))
+    )
+    by_id = {complaint.id: complaint for complaint in result.scalars().all()}
+    return [by_id[complaint_id] for complaint_id in dict.fromkeys(complaint_ids) if complaint_id in by_id]
+
 async def get_audit_logs(db: AsyncSession, complaint_id: int):
-    result = await db.execute(select(models.AuditLog).where(models.AuditLog.complaint_id == complaint_id).order_by(models.AuditLog.timestamp.desc()))
-    return result.scalars().all()
+    result = await db.execute(select(*models.AuditLog.__table__.c).where(models.AuditLog.complaint_id == complaint_id).order_by(models.AuditLog.timestamp.desc()))
+    return [dict(row) for row in result.mappings()]
 
 async def create_complaint(db: AsyncSession, complaint: schemas.ComplaintCreate, user_id: int):
     # Extract tag_ids before creating complaint
@@ -65,15 +160,26 @@ async def create_complaint(db: AsyncSession, complaint: schemas.ComplaintCreate,
         complaint_data['priority'] = complaint_data['priority'].value
     
     db_complaint = models.Complaint(**complaint_data, created_by_id=user_id)
+    # Same transaction timestamp as the created_at server default
+    db_complaint.sla_due_at = func.now() + sla.due_in(db_complaint.priority)
     
     # Add tags if provided
+    tags = []
     if tag_ids:
         tags_result = await db.execute(select(models.Tag).where(models.Tag.id.in_(tag_ids)))
         tags = tags_result.scalars().all()
-        db_complaint.tags = tags
+    # Always assign, even when empty: the hooks below read complaint.tags, and a
+    # lazy load on an AsyncSession raises
+    db_complaint.tags = tags
     
     db.add(db_complaint)
+    await db.flush()
+    await similarity.index_complaint(db, db_complaint.id, db_complaint.title, db_complaint.description)
+    await assignment.auto_assign(db, db_complaint)
+    await rollups.record_created(db, db_complaint.priority, [tag.id for tag in tags])
+    await saved_searches.record_matches(db, db_complaint)
     await db.commit()
+    await cache.invalidate_complaint_lists()
     
     # Eagerly load tags on refresh
     result = await db.execute(
@@ -98,6 +204,15 @@ async def update_complaint(db: AsyncSession, complaint_id: int, complaint_update
     # Extract tag_ids before updating
     tag_ids = complaint_update.tag_ids if complaint_update.tag_ids is not None else None
     update_data = complaint_update.dict(exclude_unset=True, exclude={'tag_ids'})
+    # An explicit null only means something for the assignee ("unassign"); for the
+    # other fields it is ignored rather than blanking status/priority (which the
+    # SLA, rollup and queue code all key on)
+    update_data = {key: value for key, value in update_data.items() if value is not None or key == 'assigned_to_id'}
+    old_status = _enum_value(db_complaint.status)
+    old_assignee = db_complaint.assigned_to_id
+    old_priority = _enum_value(db_complaint.priority)
+    old_tag_ids = [tag.id for tag in db_complaint.tags]
+    old_resolved_at = db_complaint.resolved_at if old_status == models.ComplaintStatus.RESOLVED.value else None
     
     # Update fields
     for key, value in update_data.items():
@@ -110,6 +225,30 @@ async def update_complaint(db: AsyncSession, complaint_id: int, complaint_update
         db_complaint.tags = tags
         update_data['tags'] = f"{len(tag_ids)} tags"
     
+    if 'title' in update_data or 'description' in update_data:
+        await similarity.index_complaint(db, complaint_id, db_complaint.title, db_complaint.description)
+    
+    if _enum_value(db_complaint.priority) != old_priority:
+        db_complaint.sla_due_at = db_complaint.created_at + sla.due_in(db_complaint.priority)
+    
+    # Keep reporting rollups in step: first move the complaint's existing counts to
+    # its new priority/tags, then apply any resolve/reopen under the new ones
+    await rollups.record_reclassified(db, [rollups.Reclassification(
+        db_complaint.created_at, old_resolved_at,
+        old_priority, _enum_value(db_complaint.priority),
+        old_tag_ids, [tag.id for tag in db_complaint.tags],
+    )])
+    new_status = _enum_value(db_complaint.status)
+    if new_status != old_status:
+        if new_status == models.ComplaintStatus.RESOLVED.value:
+            db_complaint.resolved_at = datetime.now(timezone.utc)
+            await rollups.record_resolved(db, db_complaint, db_complaint.resolved_at)
+        elif old_status == models.ComplaintStatus.RESOLVED.value:
+            await rollups.record_reopened(db, db_complaint)
+            db_complaint.resolved_at = None
+    
+    await saved_searches.record_matches(db, db_complaint)
+    
     # Create audit log
     audit_log = models.AuditLog(
         complaint_id=complaint_id,
@@ -119,6 +258,8 @@ async def update_complaint(db: AsyncSession, complaint_id: int, complaint_update
     db.add(audit_log)
     
     await db.commit()
+    await cache.invalidate_complaint_lists()
+    assignment.assigner.on_complaint_changed(old_assignee, old_status, db_complaint.assigned_to_id, new_status)
     
     # Refresh with eager loading
     result = await db.execute(
@@ -131,17 +272,11 @@ async def update_complaint(db: AsyncSession, complaint_id: int, complaint_update
 async def get_comments(db: AsyncSession, complaint_id: int):
     result = await db.execute(
         select(models.Comment)
+        .options(selectinload(models.Comment.user))
         .where(models.Comment.complaint_id == complaint_id)
         .order_by(models.Comment.created_at.desc())
     )
-    comments = result.scalars().all()
-    
-    # Fetch user details for each comment
-    for comment in comments:
-        user_result = await db.execute(select(models.User).where(models.User.id == comment.user_id))
-        comment.user = user_result.scalars().first()
-    
-    return comments
+    return result.scalars().all()
 
 async def create_comment(db: AsyncSession, comment: schemas.CommentCreate, complaint_id: int, user_id: int):
     db_comment = models.Comment(
@@ -159,9 +294,165 @@ async def create_comment(db: AsyncSession, comment: schemas.CommentCreate, compl
     
     return db_comment
 
+# Attachment CRUD
+async def get_attachments(db: AsyncSession, complaint_id: int):
+    result = await db.execute(
+        select(models.Attachment)
+        .where(models.Attachment.complaint_id == complaint_id)
+        .order_by(models.Attachment.created_at.desc())
+    )
+    return result.scalars().all()
+
+async def get_attachment(db: AsyncSession, complaint_id: int, attachment_id: int):
+    result = await db.execute(
+        select(models.Attachment)
+        .where(models.Attachment.id == attachment_id, models.Attachment.complaint_id == complaint_id)
+    )
+    return result.scalars().first()
+
+async def _lock_blob(db: AsyncSession, sha256: str):
+    """Serialize blob store/remove for one content hash until the transaction ends"""
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(:namespace, :key)"),
+        {"namespace": attachments.BLOB_LOCK_NAMESPACE, "key": attachments.blob_lock_key(sha256)},
+    )
+
+async def create_attachment(db: AsyncSession, complaint_id: int, user_id: int, filename: str, content_type: str, size: int, sha256: str, tmp_path: str):
+    """Move the uploaded temp file into the blob store and record the attachment"""
+    try:
+        await _lock_blob(db, sha256)
+        await run_in_threadpool(attachments.store_blob, tmp_path, sha256)
+    finally:
+        await run_in_threadpool(attachments.discard_file, tmp_path)
+    db_attachment = models.Attachment(
+        complaint_id=complaint_id,
+        uploaded_by_id=user_id,
+        filename=filename,
+        content_type=content_type,
+        size=size,
+        sha256=sha256,
+    )
+    db.add(db_attachment)
+    db.add(models.AuditLog(
+        complaint_id=complaint_id,
+        changed_by_id=user_id,
+        change_description=f"Attachment added: {filename}"
+    ))
+    await db.commit()
+    await db.refresh(db_attachment)
+    return db_attachment
+
+async def delete_attachment(db: AsyncSession, complaint_id: int, attachment_id: int, user_id: int):
+    """Delete an attachment row, and its blob if no other attachment shares it"""
+    db_attachment = await get_attachment(db, complaint_id, attachment_id)
+    if not db_attachment:
+        return None
+
+    await _lock_blob(db, db_attachment.sha256)
+    await db.delete(db_attachment)
+    db.add(models.AuditLog(
+        complaint_id=complaint_id,
+        changed_by_id=user_id,
+        change_description=f"Attachment removed: {db_attachment.filename}"
+    ))
+    await db.flush()
+
+    result = await db.execute(
+        select(models.Attachment.id).where(models.Attachment.sha256 == db_attachment.sha256).limit(1)
+    )
+    detached = None
+    if result.first() is None:
+        # Moved aside rather than removed, so a failed commit can put it back
+        detached = await run_in_threadpool(attachments.detach_blob, db_attachment.sha256)
+    try:
+        await db.commit()
+    except BaseException:
+        if detached is not None:
+            await run_in_threadpool(attachments.restore_blob, detached, db_attachment.sha256)
+        raise
+    if detached is not None:
+        await run_in_threadpool(attachments.discard_file, detached)
+    return db_attachment
+
+# Saved search CRUD
+async def get_saved_searches(db: AsyncSession, user_id: int):
+    """The user's saved searches with their unseen match counts, in one query"""
+    unseen = func.count(models.SavedSearchMatch.complaint_id).label("unseen_count")
+    result = await db.execute(
+        select(models.SavedSearch, unseen)
+        .outerjoin(
+            models.SavedSearchMatch,
+            (models.SavedSearchMatch.saved_search_id == models.SavedSearch.id) & (models.SavedSearchMatch.seen.is_(False)),
+        )
+        .where(models.SavedSearch.user_id == user_id)
+        .group_by(models.SavedSearch.id)
+        .order_by(models.SavedSearch.name)
+    )
+    searches = []
+    for saved_search, unseen_count in result.all():
+        saved_search.unseen_count = unseen_count
+        searches.append(saved_search)
+    return searches
+
+async def get_saved_search(db: AsyncSession, saved_search_id: int, user_id: int):
+    result = await db.execute(
+        select(models.SavedSearch)
+        .where(models.SavedSearch.id == saved_search_id, models.SavedSearch.user_id == user_id)
+    )
+    return result.scalars().first()
+
+async def create_saved_search(db: AsyncSession, saved_search: schemas.SavedSearchCreate, user_id: int):
+    search_data = {key: _enum_value(value) for key, value in saved_search.dict().items()}
+    db_saved_search = models.SavedSearch(**search_data, user_id=user_id)
+    db.add(db_saved_search)
+    await db.commit()
+    await db.refresh(db_saved_search)
+    saved_searches.saved_search_index.add(saved_searches.search_to_dict(db_saved_search))
+    db_saved_search.unseen_count = 0
+    return db_saved_search
+
+async def delete_saved_search(db: AsyncSession, saved_search_id: int, user_id: int):
+    db_saved_search = await get_saved_search(db, saved_search_id, user_id)
+    if not db_saved_search:
+        return None
+    await db.delete(db_saved_search)
+    await db.commit()
+    saved_searches.saved_search_index.remove(saved_search_id)
+    return db_saved_search
+
+async def get_saved_search_matches(db: AsyncSession, saved_search_id: int, unseen_only: bool = True, limit: int = 50):
+    query = (
+        select(
+            models.SavedSearchMatch.complaint_id,
+            models.SavedSearchMatch.matched_at,
+            models.SavedSearchMatch.seen,
+            models.Complaint.title,
+            models.Complaint.status,
+            models.Complaint.priority,
+        )
+        .join(models.Complaint, models.Complaint.id == models.SavedSearchMatch.complaint_id)
+        .where(models.SavedSearchMatch.saved_search_id == saved_search_id)
+        .order_by(models.SavedSearchMatch.matched_at.desc())
+        .limit(limit)
+    )
+    if unseen_only:
+        query = query.where(models.SavedSearchMatch.seen.is_(False))
+    result = await db.execute(query)
+    return [dict(row) for row in result.mappings()]
+
+async def mark_saved_search_seen(db: AsyncSession, saved_search_id: int):
+    await db.execute(
+        update(models.SavedSearchMatch)
+        .where(models.SavedSearchMatch.saved_search_id == saved_search_id, models.SavedSearchMatch.seen.is_(False))
+        .values(seen=True)
+    )
+    await db.commit()
+
 # User Management CRUD
+_user_list_columns = [column for column in models.User.__table__.c if column.name != "password_hash"]
+
 async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, search: str = None):
-    query = select(models.User)
+    query = select(*_user_list_columns)
     
     if search:
         search_filter = f"%{search}%"
@@ -169,7 +460,7 @@ async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, search: s
     
     query = query.offset(skip).limit(limit).order_by(models.User.created_at.desc())
     result = await db.execute(query)
-    return result.scalars().all()
+    return [dict(row) for row in result.mappings()]
 
 async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserUpdate):
     result = await db.execute(select(models.User).where(models.User.id == user_id))
@@ -183,7 +474,9 @@ async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserU
         setattr(db_user, key, value)
     
     await db.commit()
+    assignment.assigner.invalidate()
     await db.refresh(db_user)
+    user_directory.username_index.sync(db_user)
     return db_user
 
 async def reset_user_password(db: AsyncSession, user_id: int, new_password: str):
@@ -207,9 +500,25 @@ async def toggle_user_status(db: AsyncSession, user_id: int):
     
     db_user.is_active = not db_user.is_active
     await db.commit()
+    assignment.assigner.invalidate()
     await db.refresh(db_user)
+    user_directory.username_index.sync(db_user)
     return db_user
 
+async def get_agent_skills(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.agent_skills.c.tag_id).where(models.agent_skills.c.user_id == user_id).order_by(models.agent_skills.c.tag_id)
+    )
+    return result.scalars().all()
+
+async def set_agent_skills(db: AsyncSession, user_id: int, tag_ids: list):
+    await db.execute(delete(models.agent_skills).where(models.agent_skills.c.user_id == user_id))
+    if tag_ids:
+        await db.execute(insert(models.agent_skills), [{"user_id": user_id, "tag_id": tag_id} for tag_id in set(tag_ids)])
+    await db.commit()
+    assignment.assigner.invalidate()
+    return await get_agent_skills(db, user_id)
+
 # Tag CRUD
 async def get_tags(db: AsyncSession):
     result = await db.execute(select(models.Tag).order_by(models.Tag.name))
@@ -238,16 +547,84 @@ async def update_tag(db: AsyncSession, tag_id: int, tag_update: schemas.TagUpdat
         setattr(db_tag, key, value)
     
     await db.commit()
+    await cache.invalidate_complaint_lists()
     await db.refresh(db_tag)
     return db_tag
 
-async def delete_tag(db: AsyncSession, tag_id: int):
+async def _audit_tagged_complaints(db: AsyncSession, tag_id: int, user_id: int, description: str):
+    """One audit entry per complaint carrying the tag, written set-based in SQL; returns the count"""
+    result = await db.execute(
+        insert(models.AuditLog).from_select(
+            ["complaint_id", "changed_by_id", "change_description"],
+            select(
+                models.complaint_tags.c.complaint_id,
+                literal(user_id, Integer),
+                literal(description, String),
+            ).where(models.complaint_tags.c.tag_id == tag_id),
+        )
+    )
+    return result.rowcount
+
+async def delete_tag(db: AsyncSession, tag_id: int, user_id: int):
     result = await db.execute(select(models.Tag).where(models.Tag.id == tag_id))
     db_tag = result.scalars().first()
     
     if not db_tag:
         return None
     
-    await db.delete(db_tag)
+    # complaint_tags rows go with the tag via ON DELETE CASCADE; no complaint is loaded
+    await _audit_tagged_complaints(db, tag_id, user_id, f"Tag removed: {db_tag.name} (tag deleted)")
+    await db.execute(delete(models.Tag).where(models.Tag.id == tag_id))
     await db.commit()
+    await cache.invalidate_complaint_lists()
+    saved_searches.saved_search_index.invalidate()
+    assignment.assigner.invalidate()
     return db_tag
+
+async def merge_tags(db: AsyncSession, source_tag_id: int, target_tag_id: int, user_id: int):
+    """Move everything tagged with the source tag onto the target tag, then delete the source.
+
+    Runs as a handful of set-based statements, so memory use doesn't depend on how many
+    complaints carry the tag. Rollup counts of the source are added onto the target's,
+    except for complaints that carried both tags.
+    Returns the number of complaints that carried the source tag.
+    """
+    source = await get_tag(db, source_tag_id)
+    target = await get_tag(db, target_tag_id)
+    
+    affected = await _audit_tagged_complaints(db, source_tag_id, user_id, f"Tag merged: {source.name} -> {target.name}")
+    
+    # Before retagging: complaints that already carry the target are counted under it
+    await rollups.record_tag_merged(db, source_tag_id, target_tag_id)
+    
+    tagged = select(models.complaint_tags.c.complaint_id, literal(target_tag_id, Integer)).where(
+        models.complaint_tags.c.tag_id == source_tag_id
+    )
+    await db.execute(
+        pg_insert(models.complaint_tags)
+        .from_select(["complaint_id", "tag_id"], tagged)
+        .on_conflict_do_nothing()
+    )
+    
+    skills = select(models.agent_skills.c.user_id, literal(target_tag_id, Integer)).where(
+        models.agent_skills.c.tag_id == source_tag_id
+    )
+    await db.execute(
+        pg_insert(models.agent_skills)
+        .from_select(["user_id", "tag_id"], skills)
+        .on_conflict_do_nothing()
+    )
+    
+    await db.execute(
+        update(models.SavedSearch)
+        .where(models.SavedSearch.tag_id == source_tag_id)
+        .values(tag_id=target_tag_id)
+    )
+    
+    # Remaining source rows (complaint_tags, stats, skills) are removed by ON DELETE CASCADE
+    await db.execute(delete(models.Tag).where(models.Tag.id == source_tag_id))
+    await db.commit()
+    await cache.invalidate_complaint_lists()
+    saved_searches.saved_search_index.invalidate()
+    assignment.assigner.invalidate()
+    return affected
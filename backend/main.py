@@ -1,8 +1,24 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="Complaint Management System API")
 
+from routers import users, complaints, admin, tags, attachments, reports, saved_searches, profiles
+import database
+import sla
+import cache
+import profiling
+import admission
+
+# Middleware added last runs first: CORS -> admission control -> profiler -> routes.
+# CORS stays outermost so 429/503 responses still carry CORS headers.
+
+# Opt-in per-request profiler for admins (X-Profile: 1 or ?profile=1)
+app.add_middleware(profiling.ProfilingMiddleware)
+# Per-user rate limits and a DB concurrency gate that sheds load with 429/503
+app.add_middleware(admission.AdmissionControlMiddleware)
+
 origins = [
     "http://localhost:5173",  # Vite default port
     "http://localhost:3000",
@@ -17,19 +33,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-from routers import users, complaints, admin, tags
-from database import engine, Base
-
 app.include_router(users.router)
 app.include_router(complaints.router)
 app.include_router(admin.router)
 app.include_router(tags.router)
+app.include_router(attachments.router)
+app.include_router(reports.router)
+app.include_router(saved_searches.router)
+app.include_router(profiles.router)
 
+# Schema creation lives in migrate_db.py and runs as an explicit deploy step,
+# so new workers only need to warm their connection pool before serving.
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await database.warm_up_pool()
+    if sla.SLA_SCHEDULER_ENABLED:
+        app.state.sla_task = asyncio.create_task(sla.sla_scheduler())
+
+@app.on_event("shutdown")
+async def shutdown():
+    task = getattr(app.state, "sla_task", None)
+    if task:
+        task.cancel()
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Complaint Management System API"}
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "complaint_list_cache": cache.complaint_list_cache.stats(),
+        "admission": [stats() for stats in admission.admission_stats],
+    }
@@ -0,0 +1,283 @@
+import asyncio
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from database import engine, Base
+import models  # Import models to register them with Base
+import sla
+
+# Versioned, recorded schema migrations that are safe to run against a live database.
+#
+# Every step commits on its own and is recorded in schema_migrations, so an
+# interrupted run resumes at the step (and for backfills, the batch) where it
+# stopped. DDL that needs a table lock waits at most LOCK_TIMEOUT and is retried
+# instead of queueing behind long transactions and stalling traffic; indexes are
+# built CONCURRENTLY; data changes are applied in small committed batches.
+
+MIGRATION_LOCK_KEY = 340001
+LOCK_TIMEOUT = "3s"
+LOCK_RETRIES = 20
+LOCK_NOT_AVAILABLE = "55P03"
+
+class CreateTables:
+    """Create tables that don't exist yet (all of them if no names are given)"""
+
+    def __init__(self, *names):
+        self.names = names
+
+    def describe(self):
+        return f"create tables {', '.join(self.names) or '(all missing)'}"
+
+    async def run(self, migration, step_index):
+        tables = [Base.metadata.tables[name] for name in self.names] or None
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=tables)
+
+class Sql:
+    """Short DDL/DML statement run with a lock timeout and retried if the lock isn't granted"""
+
+    def __init__(self, statement: str):
+        self.statement = statement
+
+    def describe(self):
+        return " ".join(self.statement.split())[:80]
+
+    async def run(self, migration, step_index):
+        for attempt in range(1, LOCK_RETRIES + 1):
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                    await conn.execute(text(self.statement))
+                return
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE or attempt == LOCK_RETRIES:
+                    raise
+                print(f"    lock not available, retrying ({attempt}/{LOCK_RETRIES})")
+                await asyncio.sleep(min(attempt, 10))
+
+class ConcurrentIndex:
+    """CREATE INDEX CONCURRENTLY, outside a transaction; rebuilds an index left invalid by a failed run"""
+
+    def __init__(self, name: str, definition: str, unique: bool = False):
+        self.name = name
+        self.definition = definition
+        self.unique = unique
+
+    def describe(self):
+        return f"create index {self.name} concurrently"
+
+    async def run(self, migration, step_index):
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            valid = (await conn.execute(text("""
+                SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = :name
+            """), {"name": self.name})).scalar()
+            if valid:
+                return
+            if valid is False:
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {self.name}"))
+            unique = "UNIQUE " if self.unique else ""
+            await conn.execute(text(f"CREATE {unique}INDEX CONCURRENTLY {self.name} ON {self.definition}"))
+
+class Backfill:
+    """UPDATE rows matching `where` in id-ordered batches, committing and pausing between batches.
+
+    The last processed id is recorded after every batch so a failed run resumes where it stopped.
+    """
+
+    def __init__(self, table: str, assignments: str, where: str, batch_size: int = 1000, pause: float = 0.05):
+        self.table = table
+        self.assignments = assignments
+        self.where = where
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def describe(self):
+        return f"backfill {self.table}: SET {self.assignments}"
+
+    async def run(self, migration, step_index):
+        async with engine.connect() as conn:
+            cursor = (await conn.execute(
+                text("SELECT backfill_cursor FROM schema_migrations WHERE version = :version"),
+                {"version": migration.version},
+            )).scalar() or 0
+            max_id = (await conn.execute(text(f"SELECT max(id) FROM {self.table}"))).scalar() or 0
+            await conn.commit()
+
+            total = 0
+            while cursor < max_id:
+                result = await conn.execute(text(f"""
+                    UPDATE {self.table} SET {self.assignments}
+                    WHERE id IN (
+                        SELECT id FROM {self.table}
+                        WHERE id > :cursor AND id <= :max_id AND ({self.where})
+                        ORDER BY id LIMIT :batch
+                    )
+                    RETURNING id
+                """), {"cursor": cursor, "max_id": max_id, "batch": self.batch_size})
+                ids = result.scalars().all()
+                cursor = max(ids) if ids else max_id
+                total += len(ids)
+                await conn.execute(
+                    text("UPDATE schema_migrations SET backfill_cursor = :cursor WHERE version = :version"),
+                    {"cursor": cursor, "version": migration.version},
+                )
+                await conn.commit()
+                print(f"    {total} rows updated, id {cursor}/{max_id} ({cursor * 100 // max(max_id, 1)}%)")
+                await asyncio.sleep(self.pause)
+
+            await conn.execute(
+                text("UPDATE schema_migrations SET backfill_cursor = NULL WHERE version = :version"),
+                {"version": migration.version},
+            )
+            await conn.commit()
+
+class Migration:
+    def __init__(self, version: str, description: str, steps: list):
+        self.version = version
+        self.description = description
+        self.steps = steps
+
+MIGRATIONS = [
+    Migration("0001", "Create missing tables", [
+        CreateTables(),
+    ]),
+    Migration("0002", "User management, priority and tags columns", [
+        Sql("ALTER TABLE users ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE"),
+        Sql("ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE"),
+        Sql("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_login TIMESTAMP WITH TIME ZONE"),
+        Sql("ALTER TABLE complaints ADD COLUMN IF NOT EXISTS priority VARCHAR DEFAULT 'medium'"),
+        Backfill("users", "is_active = TRUE", "is_active IS NULL"),
+    ]),
+    Migration("0003", "SLA tracking", [
+        Sql("ALTER TABLE complaints ADD COLUMN IF NOT EXISTS sla_breached_at TIMESTAMP WITH TIME ZONE"),
+        ConcurrentIndex("ix_complaints_status_priority_created_at", "complaints (status, priority, created_at)"),
+    ]),
+    Migration("0004", "Indexes for the my-queue endpoints", [
+        ConcurrentIndex("ix_complaints_assigned_status_created", "complaints (assigned_to_id, status, created_at, id)"),
+        ConcurrentIndex("ix_complaints_created_by_status_created", "complaints (created_by_id, status, created_at, id)"),
+    ]),
+    Migration("0005", "Resolution timestamp for reporting rollups", [
+        Sql("ALTER TABLE complaints ADD COLUMN IF NOT EXISTS resolved_at TIMESTAMP WITH TIME ZONE"),
+        Backfill("complaints", "resolved_at = COALESCE(updated_at, created_at)", "status = 'resolved' AND resolved_at IS NULL"),
+    ]),
+    Migration("0006", "Saved searches", [
+        CreateTables("saved_searches", "saved_search_matches"),
+    ]),
+    Migration("0007", "Agent skills for auto-assignment", [
+        CreateTables("agent_skills"),
+    ]),
+    Migration("0008", "Cascade complaint_tags rows on tag/complaint delete", [
+        ConcurrentIndex("ix_complaint_tags_tag_id", "complaint_tags (tag_id, complaint_id)"),
+        # NOT VALID + VALIDATE avoids holding a blocking lock while existing rows are checked
+        Sql("""
+            ALTER TABLE complaint_tags
+            DROP CONSTRAINT IF EXISTS complaint_tags_tag_id_fkey,
+            ADD CONSTRAINT complaint_tags_tag_id_fkey FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE NOT VALID
+        """),
+        Sql("ALTER TABLE complaint_tags VALIDATE CONSTRAINT complaint_tags_tag_id_fkey"),
+        Sql("""
+            ALTER TABLE complaint_tags
+            DROP CONSTRAINT IF EXISTS complaint_tags_complaint_id_fkey,
+            ADD CONSTRAINT complaint_tags_complaint_id_fkey FOREIGN KEY (complaint_id) REFERENCES complaints (id) ON DELETE CASCADE NOT VALID
+        """),
+        Sql("ALTER TABLE complaint_tags VALIDATE CONSTRAINT complaint_tags_complaint_id_fkey"),
+    ]),
+    Migration("0009", "SLA due time per complaint", [
+        Sql("ALTER TABLE complaints ADD COLUMN IF NOT EXISTS sla_due_at TIMESTAMP WITH TIME ZONE"),
+        Backfill("complaints", f"sla_due_at = {sla.due_at_sql()}", "sla_due_at IS NULL"),
+        ConcurrentIndex(
+            "ix_complaints_sla_due_at",
+            "complaints (sla_due_at) WHERE sla_breached_at IS NULL AND status IN ('open', 'in_progress')",
+        ),
+    ]),
+    Migration("0010", "Drop the SLA scheduler watermark, superseded by sla_due_at", [
+        Sql("DROP TABLE IF EXISTS scheduler_state"),
+    ]),
+    Migration("0011", "Shared generation counter for the complaint list cache", [
+        Sql("CREATE SEQUENCE IF NOT EXISTS complaint_list_generation"),
+    ]),
+]
+
+async def _ensure_migrations_table():
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR PRIMARY KEY,
+                description VARCHAR,
+                completed_steps INTEGER NOT NULL DEFAULT 0,
+                backfill_cursor BIGINT,
+                applied_at TIMESTAMP WITH TIME ZONE
+            )
+        """))
+
+async def _migration_state():
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT version, completed_steps, applied_at FROM schema_migrations"))
+        return {row.version: row for row in result}
+
+async def run_migrations():
+    """Apply pending migrations in version order"""
+    await _ensure_migrations_table()
+
+    async with engine.connect() as lock_conn:
+        locked = (await lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})).scalar()
+        await lock_conn.commit()
+        if not locked:
+            print("Another migration run is in progress; exiting.")
+            return
+
+        try:
+            state = await _migration_state()
+            pending = [m for m in MIGRATIONS if m.version not in state or state[m.version].applied_at is None]
+            if not pending:
+                print("Database schema is up to date.")
+                return
+
+            for migration in pending:
+                done = state[migration.version].completed_steps if migration.version in state else 0
+                print(f"Applying {migration.version}: {migration.description}")
+                async with engine.begin() as conn:
+                    await conn.execute(text("""
+                        INSERT INTO schema_migrations (version, description) VALUES (:version, :description)
+                        ON CONFLICT (version) DO NOTHING
+                    """), {"version": migration.version, "description": migration.description})
+
+                for index, step in enumerate(migration.steps):
+                    if index < done:
+                        continue
+                    started = time.monotonic()
+                    print(f"  [{index + 1}/{len(migration.steps)}] {step.describe()}")
+                    await step.run(migration, index)
+                    async with engine.begin() as conn:
+                        await conn.execute(
+                            text("UPDATE schema_migrations SET completed_steps = :steps WHERE version = :version"),
+                            {"steps": index + 1, "version": migration.version},
+                        )
+                    print(f"    ✓ done in {time.monotonic() - started:.1f}s")
+
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        text("UPDATE schema_migrations SET applied_at = now() WHERE version = :version"),
+                        {"version": migration.version},
+                    )
+                print(f"✓ {migration.version} applied")
+
+            print("\n✅ Database migration completed successfully!")
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            await lock_conn.commit()
+
+async def show_status():
+    await _ensure_migrations_table()
+    state = await _migration_state()
+    for migration in MIGRATIONS:
+        row = state.get(migration.version)
+        if row is None:
+            status = "pending"
+        elif row.applied_at is None:
+            status = f"in progress ({row.completed_steps}/{len(migration.steps)} steps)"
+        else:
+            status = f"applied {row.applied_at:%Y-%m-%d %H:%M}"
+        print(f"{migration.version}  {migration.description:<50} {status}")
@@ -1,11 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Text, Boolean, Table
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, Float, String, ForeignKey, Date, DateTime, Enum, Text, Boolean, Table, Index, Sequence
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import enum
 from database import Base
 
 class UserRole(str, enum.Enum):
     ADMIN = "admin"
+    AGENT = "agent"
     USER = "user"
 
 class ComplaintStatus(str, enum.Enum):
@@ -38,8 +39,10 @@ class User(Base):
 complaint_tags = Table(
     'complaint_tags',
     Base.metadata,
-    Column('complaint_id', Integer, ForeignKey('complaints.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+    Column('complaint_id', Integer, ForeignKey('complaints.id', ondelete="CASCADE"), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete="CASCADE"), primary_key=True),
+    # Lets tag deletes/merges find a tag's rows without scanning the whole table
+    Index('ix_complaint_tags_tag_id', 'tag_id', 'complaint_id')
 )
 
 class Complaint(Base):
@@ -54,19 +57,37 @@ class Complaint(Base):
     assigned_to_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    sla_breached_at = Column(DateTime(timezone=True), nullable=True)
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+    # created_at + the SLA allowance of the current priority (see sla.py)
+    sla_due_at = Column(DateTime(timezone=True), nullable=True)
 
     creator = relationship("User", foreign_keys=[created_by_id], back_populates="complaints_created")
     assignee = relationship("User", foreign_keys=[assigned_to_id], back_populates="complaints_assigned")
     audit_logs = relationship("AuditLog", back_populates="complaint")
     comments = relationship("Comment", back_populates="complaint")
     tags = relationship("Tag", secondary=complaint_tags, back_populates="complaints")
+    attachments = relationship("Attachment", back_populates="complaint")
+
+    __table_args__ = (
+        # Serves status/priority filtered lists ordered by age
+        Index("ix_complaints_status_priority_created_at", "status", "priority", "created_at"),
+        # The SLA scheduler's candidates: active complaints not yet flagged, by due time
+        Index(
+            "ix_complaints_sla_due_at", "sla_due_at",
+            postgresql_where=text("sla_breached_at IS NULL AND status IN ('open', 'in_progress')"),
+        ),
+        # "My queue" counts and keyset pages are answered from these without touching the heap
+        Index("ix_complaints_assigned_status_created", "assigned_to_id", "status", "created_at", "id"),
+        Index("ix_complaints_created_by_status_created", "created_by_id", "status", "created_at", "id"),
+    )
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
 
     id = Column(Integer, primary_key=True, index=True)
     complaint_id = Column(Integer, ForeignKey("complaints.id"))
-    changed_by_id = Column(Integer, ForeignKey("users.id"))
+    changed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL for system changes
     change_description = Column(String)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -93,4 +114,89 @@ class Tag(Base):
     color = Column(String, default="#3B82F6")  # Default blue color
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    complaints = relationship("Complaint", secondary=complaint_tags, back_populates="tags")
+    # The database removes complaint_tags rows when a tag is deleted (ON DELETE CASCADE),
+    # so the ORM must not load every linked complaint to do it
+    complaints = relationship("Complaint", secondary=complaint_tags, back_populates="tags", passive_deletes=True)
+
+# Generation counter of the complaint list cache, shared by all workers (see cache.py)
+complaint_list_generation = Sequence("complaint_list_generation", metadata=Base.metadata)
+
+class ComplaintLSHBucket(Base):
+    """MinHash band buckets of a complaint's title + description (see similarity.py)"""
+    __tablename__ = "complaint_lsh_buckets"
+
+    complaint_id = Column(Integer, ForeignKey("complaints.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_complaint_lsh_buckets_band_bucket", "band", "bucket"),
+    )
+
+class Attachment(Base):
+    __tablename__ = "attachments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    complaint_id = Column(Integer, ForeignKey("complaints.id", ondelete="CASCADE"), index=True)
+    uploaded_by_id = Column(Integer, ForeignKey("users.id"))
+    filename = Column(String)
+    content_type = Column(String)
+    size = Column(BigInteger)
+    sha256 = Column(String(64), index=True)  # blob key on disk, shared by identical uploads
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    complaint = relationship("Complaint", back_populates="attachments")
+    uploaded_by = relationship("User")
+
+# Reporting rollups, maintained incrementally by rollups.py (UTC days)
+class DailyComplaintStats(Base):
+    __tablename__ = "daily_complaint_stats"
+
+    day = Column(Date, primary_key=True)
+    priority = Column(String, primary_key=True)
+    created_count = Column(Integer, nullable=False, default=0)
+    resolved_count = Column(Integer, nullable=False, default=0)
+    resolve_seconds_total = Column(Float, nullable=False, default=0)
+
+class DailyTagStats(Base):
+    __tablename__ = "daily_tag_stats"
+
+    day = Column(Date, primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    created_count = Column(Integer, nullable=False, default=0)
+    resolved_count = Column(Integer, nullable=False, default=0)
+    resolve_seconds_total = Column(Float, nullable=False, default=0)
+
+class SavedSearch(Base):
+    """A user's saved complaint filter; same filters as GET /complaints"""
+    __tablename__ = "saved_searches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    name = Column(String)
+    search = Column(String, nullable=True)
+    status = Column(String, nullable=True)
+    priority = Column(String, nullable=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class SavedSearchMatch(Base):
+    """Complaint that matched a saved search when it was created or updated"""
+    __tablename__ = "saved_search_matches"
+
+    saved_search_id = Column(Integer, ForeignKey("saved_searches.id", ondelete="CASCADE"), primary_key=True)
+    complaint_id = Column(Integer, ForeignKey("complaints.id", ondelete="CASCADE"), primary_key=True)
+    matched_at = Column(DateTime(timezone=True), server_default=func.now())
+    seen = Column(Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        Index("ix_saved_search_matches_search_seen", "saved_search_id", "seen"),
+    )
+
+# Tags an agent is skilled in; auto-assignment prefers skilled agents
+agent_skills = Table(
+    'agent_skills',
+    Base.metadata,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True),
+    Column('tag_id', Integer, ForeignKey('tags.id', ondelete="CASCADE"), primary_key=True)
+)
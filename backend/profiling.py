@@ -0,0 +1,232 @@
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+import auth, database
+
+# On-demand profiling of a single request, for administrators.
+#
+# A request opts in with the `X-Profile: 1` header or `?profile=1`. If the
+# caller is an admin, the request runs with a sampling profiler on the event
+# loop thread and with SQL timing hooks on the engine; the result is written to
+# PROFILE_DIR as a speedscope file plus a SQL log, and its id is returned in the
+# `X-Profile-Id` response header. Other requests only pay for the header check:
+# the SQL hooks are attached only while a profiled request is in flight.
+#
+# Samples cover everything running on the event loop, so concurrent requests
+# can show up in a profile; profile on a quiet worker when possible.
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+_sql_hook_users = 0
+_sql_hook_lock = threading.Lock()
+
+class _Sampler(threading.Thread):
+    """Samples the call stack of one thread at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.frames = {}
+        self.frame_list = []
+        self.samples = []
+        self.weights = []
+
+    def _frame_index(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self.frames.get(key)
+        if index is None:
+            index = self.frames[key] = len(self.frame_list)
+            self.frame_list.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def run(self):
+        last = time.perf_counter()
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_index(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+class _Profile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.queries = []
+        self.sampler = _Sampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.queries.append({
+            "statement": statement,
+            "duration_ms": round((time.perf_counter() - starts.pop()) * 1000, 3),
+        })
+
+def _attach_sql_hooks():
+    global _sql_hook_users
+    with _sql_hook_lock:
+        _sql_hook_users += 1
+        if _sql_hook_users == 1:
+            event.listen(database.engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(database.engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+def _detach_sql_hooks():
+    global _sql_hook_users
+    with _sql_hook_lock:
+        _sql_hook_users -= 1
+        if _sql_hook_users == 0:
+            event.remove(database.engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(database.engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+def _wants_profile(scope):
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value == b"1"
+    return b"profile=" in scope["query_string"] and parse_qs(scope["query_string"].decode("latin-1")).get("profile") == ["1"]
+
+def _bearer_token(scope):
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+async def _is_admin(scope):
+    token = _bearer_token(scope)
+    if token is None:
+        return False
+    async with database.AsyncSessionLocal() as db:
+        try:
+            user = await auth.get_current_user(token=token, db=db)
+            await auth.get_current_admin_user(current_user=user)
+        except HTTPException:
+            return False
+    return True
+
+def profile_path(profile_id: str, kind: str = "speedscope"):
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{kind}.json")
+
+def _write_profile(profile: _Profile, duration: float, status_code: int):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    sampler = profile.sampler
+    name = f"{profile.method} {profile.path}"
+    speedscope = {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "complaints-api",
+        "shared": {"frames": sampler.frame_list},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(sampler.weights),
+            "samples": sampler.samples,
+            "weights": sampler.weights,
+        }],
+    }
+    with open(profile_path(profile.id), "w") as f:
+        json.dump(speedscope, f)
+    with open(profile_path(profile.id, "sql"), "w") as f:
+        json.dump({
+            "id": profile.id,
+            "request": name,
+            "status_code": status_code,
+            "duration_ms": round(duration * 1000, 3),
+            "sql_total_ms": round(sum(q["duration_ms"] for q in profile.queries), 3),
+            "queries": profile.queries,
+        }, f, indent=2)
+
+    # Keep only the newest PROFILE_MAX_FILES profiles
+    profiles = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".sql.json")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in profiles[PROFILE_MAX_FILES:]:
+        profile_id = entry.name.split(".")[0]
+        for kind in ("speedscope", "sql"):
+            try:
+                os.remove(profile_path(profile_id, kind))
+            except FileNotFoundError:
+                pass
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.name.endswith(".sql.json"):
+            with open(entry.path) as f:
+                summary = json.load(f)
+            summary["query_count"] = len(summary.pop("queries"))
+            summary["created_at"] = entry.stat().st_mtime
+            summaries.append(summary)
+    summaries.sort(key=lambda summary: summary["created_at"], reverse=True)
+    return summaries
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope) or not await _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = _Profile(scope["method"], scope["path"])
+        status_code = None
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = dict(message, headers=[*message.get("headers", []), (b"x-profile-id", profile.id.encode())])
+            await send(message)
+
+        token = _current_profile.set(profile)
+        _attach_sql_hooks()
+        profile.sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration = time.perf_counter() - started
+            profile.sampler.stop()
+            _detach_sql_hooks()
+            _current_profile.reset(token)
+            # Serializing and pruning files would stall every request on the loop
+            await run_in_threadpool(_write_profile, profile, duration, status_code)
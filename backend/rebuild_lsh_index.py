@@ -0,0 +1,43 @@
+import asyncio
+import sys
+from sqlalchemy import select, delete, insert
+from database import engine
+import models, similarity
+
+BATCH_SIZE = 1000
+
+async def rebuild_lsh_index(batch_size: int = BATCH_SIZE):
+    """Recompute near-duplicate LSH buckets for every complaint, in committed batches"""
+    print("Rebuilding complaint LSH index...")
+    last_id = 0
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                select(models.Complaint.id, models.Complaint.title, models.Complaint.description)
+                .where(models.Complaint.id > last_id)
+                .order_by(models.Complaint.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+
+            ids = [row.id for row in rows]
+            await conn.execute(delete(models.ComplaintLSHBucket).where(models.ComplaintLSHBucket.complaint_id.in_(ids)))
+            buckets = [
+                {"complaint_id": row.id, "band": band, "bucket": bucket}
+                for row in rows
+                for band, bucket in enumerate(similarity.complaint_buckets(row.title, row.description))
+            ]
+            if buckets:
+                await conn.execute(insert(models.ComplaintLSHBucket), buckets)
+
+        last_id = ids[-1]
+        total += len(rows)
+        print(f"  indexed {total} complaints (last id {last_id})")
+
+    print(f"\n✅ LSH index rebuilt for {total} complaints")
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_lsh_index(int(sys.argv[1]) if len(sys.argv) > 1 else BATCH_SIZE))
@@ -0,0 +1,221 @@
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import NamedTuple, Optional, Sequence
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# Daily reporting counters. Updated in the same transaction as the complaint
+# write that changes them, so reports never need to scan complaints.
+#
+# Counters are attributed to each complaint's *current* priority and tags: a
+# complaint is counted as created on its creation day and, while resolved, as
+# resolved on its resolution day, under whatever priority and tags it has now.
+# When either changes, record_reclassified moves its counts over, so rebuilding
+# from complaints (backfill_rollups.py) reproduces the live counters.
+
+COUNTERS = ("created_count", "resolved_count", "resolve_seconds_total")
+
+def _value(value):
+    return getattr(value, "value", value)
+
+def _utc_day(moment: datetime):
+    return moment.astimezone(timezone.utc).date()
+
+async def _bump(db: AsyncSession, table, key_columns, rows):
+    """Upsert rows, adding their counters onto any existing ones"""
+    if not rows:
+        return
+    stmt = pg_insert(table).values(rows)
+    counters = [name for name in rows[0] if name not in key_columns]
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={name: getattr(table.c, name) + getattr(stmt.excluded, name) for name in counters},
+    ))
+
+async def _bump_stats(db: AsyncSession, day: date, priority, tag_ids, **counters):
+    await _bump(
+        db, models.DailyComplaintStats.__table__, ["day", "priority"],
+        [{"day": day, "priority": _value(priority), **counters}],
+    )
+    await _bump(
+        db, models.DailyTagStats.__table__, ["day", "tag_id"],
+        [{"day": day, "tag_id": tag_id, **counters} for tag_id in tag_ids],
+    )
+
+class Reclassification(NamedTuple):
+    """A complaint whose priority and/or tags changed; resolved_at is None unless it is resolved"""
+    created_at: datetime
+    resolved_at: Optional[datetime]
+    old_priority: str
+    new_priority: str
+    old_tag_ids: Sequence[int] = ()
+    new_tag_ids: Sequence[int] = ()
+
+async def record_reclassified(db: AsyncSession, changes):
+    """Move the counts of reclassified complaints from their old priority/tags to the new ones"""
+    priority_rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    tag_rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for change in changes:
+        events = [(_utc_day(change.created_at), {"created_count": 1})]
+        if change.resolved_at is not None:
+            seconds = (change.resolved_at - change.created_at).total_seconds()
+            events.append((_utc_day(change.resolved_at), {"resolved_count": 1, "resolve_seconds_total": seconds}))
+
+        old_priority, new_priority = _value(change.old_priority), _value(change.new_priority)
+        old_tag_ids, new_tag_ids = set(change.old_tag_ids), set(change.new_tag_ids)
+        moves = []
+        if old_priority != new_priority:
+            moves += [(priority_rows, old_priority, -1), (priority_rows, new_priority, 1)]
+        moves += [(tag_rows, tag_id, -1) for tag_id in old_tag_ids - new_tag_ids]
+        moves += [(tag_rows, tag_id, 1) for tag_id in new_tag_ids - old_tag_ids]
+
+        for day, counters in events:
+            for rows, key, sign in moves:
+                row = rows[(day, key)]
+                for name, amount in counters.items():
+                    row[name] += sign * amount
+
+    # One row per key: a single upsert may not touch the same row twice
+    await _bump(
+        db, models.DailyComplaintStats.__table__, ["day", "priority"],
+        [{"day": day, "priority": priority, **counters} for (day, priority), counters in priority_rows.items()],
+    )
+    await _bump(
+        db, models.DailyTagStats.__table__, ["day", "tag_id"],
+        [{"day": day, "tag_id": tag_id, **counters} for (day, tag_id), counters in tag_rows.items()],
+    )
+
+async def record_created(db: AsyncSession, priority, tag_ids):
+    await _bump_stats(db, _utc_day(datetime.now(timezone.utc)), priority, tag_ids, created_count=1)
+
+async def record_resolved(db: AsyncSession, complaint: models.Complaint, resolved_at: datetime):
+    seconds = (resolved_at - complaint.created_at).total_seconds()
+    await _bump_stats(
+        db, _utc_day(resolved_at), complaint.priority, [tag.id for tag in complaint.tags],
+        resolved_count=1, resolve_seconds_total=seconds,
+    )
+
+async def record_reopened(db: AsyncSession, complaint: models.Complaint):
+    """Undo the resolution counted on the day the complaint was resolved"""
+    if complaint.resolved_at is None:
+        return
+    seconds = (complaint.resolved_at - complaint.created_at).total_seconds()
+    await _bump_stats(
+        db, _utc_day(complaint.resolved_at), complaint.priority, [tag.id for tag in complaint.tags],
+        resolved_count=-1, resolve_seconds_total=-seconds,
+    )
+
+async def record_tag_merged(db: AsyncSession, source_tag_id: int, target_tag_id: int):
+    """Add the source tag's counts onto the target for complaints that don't carry the target yet.
+
+    Call before the source's complaints are tagged with the target; complaints that had
+    both tags are already counted under the target.
+    """
+    await db.execute(text("""
+        WITH moved AS (
+            SELECT c.created_at, c.resolved_at, c.status
+            FROM complaints c
+            JOIN complaint_tags ct ON ct.complaint_id = c.id AND ct.tag_id = :source_tag_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM complaint_tags t
+                WHERE t.complaint_id = c.id AND t.tag_id = :target_tag_id
+            )
+        )
+        INSERT INTO daily_tag_stats (day, tag_id, created_count, resolved_count, resolve_seconds_total)
+        SELECT day, :target_tag_id, SUM(created_count), SUM(resolved_count), SUM(resolve_seconds_total)
+        FROM (
+            SELECT (created_at AT TIME ZONE 'UTC')::date AS day,
+                   1 AS created_count, 0 AS resolved_count, 0::float AS resolve_seconds_total
+            FROM moved
+            UNION ALL
+            SELECT (resolved_at AT TIME ZONE 'UTC')::date,
+                   0, 1, EXTRACT(EPOCH FROM resolved_at - created_at)
+            FROM moved
+            WHERE status = 'resolved' AND resolved_at IS NOT NULL
+        ) events
+        GROUP BY day
+        ON CONFLICT (day, tag_id) DO UPDATE SET
+            created_count = daily_tag_stats.created_count + EXCLUDED.created_count,
+            resolved_count = daily_tag_stats.resolved_count + EXCLUDED.resolved_count,
+            resolve_seconds_total = daily_tag_stats.resolve_seconds_total + EXCLUDED.resolve_seconds_total
+    """), {"source_tag_id": source_tag_id, "target_tag_id": target_tag_id})
+
+def _mean_hours(seconds_total, resolved):
+    return round(seconds_total / resolved / 3600, 2) if resolved else None
+
+async def get_daily_report(db: AsyncSession, start: date, end: date, priority: str = None):
+    stats = models.DailyComplaintStats
+    query = (
+        select(
+            stats.day,
+            func.sum(stats.created_count).label("created"),
+            func.sum(stats.resolved_count).label("resolved"),
+            func.sum(stats.resolve_seconds_total).label("resolve_seconds"),
+        )
+        .where(stats.day >= start, stats.day <= end)
+        .group_by(stats.day)
+        .order_by(stats.day)
+    )
+    if priority:
+        query = query.where(stats.priority == priority)
+    result = await db.execute(query)
+    return [
+        {
+            "day": row.day,
+            "created": row.created,
+            "resolved": row.resolved,
+            "mean_hours_to_resolve": _mean_hours(row.resolve_seconds, row.resolved),
+        }
+        for row in result
+    ]
+
+async def get_priority_report(db: AsyncSession, start: date, end: date):
+    stats = models.DailyComplaintStats
+    result = await db.execute(
+        select(
+            stats.priority,
+            func.sum(stats.created_count).label("created"),
+            func.sum(stats.resolved_count).label("resolved"),
+            func.sum(stats.resolve_seconds_total).label("resolve_seconds"),
+        )
+        .where(stats.day >= start, stats.day <= end)
+        .group_by(stats.priority)
+        .order_by(stats.priority)
+    )
+    return [
+        {
+            "priority": row.priority,
+            "created": row.created,
+            "resolved": row.resolved,
+            "mean_hours_to_resolve": _mean_hours(row.resolve_seconds, row.resolved),
+        }
+        for row in result
+    ]
+
+async def get_tag_report(db: AsyncSession, start: date, end: date):
+    stats = models.DailyTagStats
+    result = await db.execute(
+        select(
+            stats.tag_id,
+            models.Tag.name,
+            func.sum(stats.created_count).label("created"),
+            func.sum(stats.resolved_count).label("resolved"),
+            func.sum(stats.resolve_seconds_total).label("resolve_seconds"),
+        )
+        .join(models.Tag, models.Tag.id == stats.tag_id)
+        .where(stats.day >= start, stats.day <= end)
+        .group_by(stats.tag_id, models.Tag.name)
+        .order_by(models.Tag.name)
+    )
+    return [
+        {
+            "tag_id": row.tag_id,
+            "tag_name": row.name,
+            "created": row.created,
+            "resolved": row.resolved,
+            "mean_hours_to_resolve": _mean_hours(row.resolve_seconds, row.resolved),
+        }
+        for row in result
+    ]
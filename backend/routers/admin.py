@@ -69,3 +69,28 @@ async def toggle_status(
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
+
+@router.get("/{user_id}/skills", response_model=schemas.AgentSkills)
+async def read_skills(
+    user_id: int,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_admin_user)
+):
+    """Tags an agent is skilled in (admin only)"""
+    db_user = await crud.get_user(db, user_id=user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"tag_ids": await crud.get_agent_skills(db, user_id=user_id)}
+
+@router.put("/{user_id}/skills", response_model=schemas.AgentSkills)
+async def update_skills(
+    user_id: int,
+    skills: schemas.AgentSkills,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_admin_user)
+):
+    """Replace the tags an agent is skilled in; used by auto-assignment (admin only)"""
+    db_user = await crud.get_user(db, user_id=user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"tag_ids": await crud.set_agent_skills(db, user_id=user_id, tag_ids=skills.tag_ids)}
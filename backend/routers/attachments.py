@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import schemas, crud, database, auth, models, attachments
+
+router = APIRouter(
+    prefix="/complaints",
+    tags=["attachments"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.post("/{complaint_id}/attachments", response_model=schemas.Attachment)
+async def upload_attachment(
+    complaint_id: int,
+    request: Request,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Upload a file as multipart/form-data field `file`; streamed to disk"""
+    db_complaint = await crud.get_complaint(db, complaint_id=complaint_id)
+    if not db_complaint:
+        raise HTTPException(status_code=404, detail="Complaint not found")
+
+    # End the transaction opened by the lookups so the pooled connection isn't held
+    # idle in transaction while a slow client streams the file
+    user_id = current_user.id
+    await db.rollback()
+    stored = await attachments.receive_upload(request)
+    return await crud.create_attachment(db, complaint_id=complaint_id, user_id=user_id, **stored)
+
+@router.get("/{complaint_id}/attachments", response_model=List[schemas.Attachment])
+async def list_attachments(
+    complaint_id: int,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    return await crud.get_attachments(db, complaint_id=complaint_id)
+
+@router.get("/{complaint_id}/attachments/{attachment_id}")
+async def download_attachment(
+    complaint_id: int,
+    attachment_id: int,
+    request: Request,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Download an attachment; supports single `Range: bytes=...` requests"""
+    db_attachment = await crud.get_attachment(db, complaint_id=complaint_id, attachment_id=attachment_id)
+    if db_attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return attachments.file_response(db_attachment, request.headers.get("range"))
+
+@router.delete("/{complaint_id}/attachments/{attachment_id}")
+async def delete_attachment(
+    complaint_id: int,
+    attachment_id: int,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    db_attachment = await crud.delete_attachment(
+        db, complaint_id=complaint_id, attachment_id=attachment_id, user_id=current_user.id
+    )
+    if db_attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    return {"message": "Attachment deleted successfully"}
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-import schemas, crud, database, auth, models
+import schemas, crud, database, auth, models, similarity, cache
 
 router = APIRouter(
     prefix="/complaints",
@@ -9,13 +10,20 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.post("/", response_model=schemas.Complaint)
+@router.post("/", response_model=schemas.ComplaintWithSimilar)
 async def create_complaint(
     complaint: schemas.ComplaintCreate,
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return await crud.create_complaint(db=db, complaint=complaint, user_id=current_user.id)
+    db_complaint = await crud.create_complaint(db=db, complaint=complaint, user_id=current_user.id)
+    # Surface likely duplicates so the client can suggest them to the customer
+    db_complaint.similar = await similarity.find_similar(
+        db, db_complaint.title, db_complaint.description, exclude_id=db_complaint.id
+    )
+    return db_complaint
+
+complaint_list_adapter = TypeAdapter(List[schemas.Complaint])
 
 @router.get("/", response_model=List[schemas.Complaint])
 async def read_complaints(
@@ -28,7 +36,60 @@ async def read_complaints(
     db: AsyncSession = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    return await crud.get_complaints(db, skip=skip, limit=limit, search=search, status=status, priority=priority, tag_id=tag_id)
+    if not cache.CACHE_ENABLED:
+        return await crud.get_complaints(db, skip=skip, limit=limit, search=search, status=status, priority=priority, tag_id=tag_id)
+
+    key = cache.list_key(skip=skip, limit=limit, search=search, status=status, priority=priority, tag_id=tag_id)
+    generation = await cache.complaint_list_cache.generation()
+    body = await cache.complaint_list_cache.get(generation, key)
+    if body is None:
+        complaints = await crud.get_complaints(db, skip=skip, limit=limit, search=search, status=status, priority=priority, tag_id=tag_id)
+        body = complaint_list_adapter.dump_json(complaint_list_adapter.validate_python(complaints, from_attributes=True))
+        await cache.complaint_list_cache.set(generation, key, body)
+    return Response(content=body, media_type="application/json")
+
+async def _read_queue(db, user, relationship, status, limit, cursor):
+    try:
+        return await crud.get_complaint_queue(
+            db, user, relationship, status=status, limit=max(1, min(limit, 200)), cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/queue/assigned", response_model=schemas.ComplaintQueue)
+async def read_assigned_queue(
+    status: str = None,
+    limit: int = 50,
+    cursor: str = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Complaints assigned to the current user, with per-status counts"""
+    return await _read_queue(db, current_user, models.User.complaints_assigned, status, limit, cursor)
+
+@router.get("/queue/created", response_model=schemas.ComplaintQueue)
+async def read_created_queue(
+    status: str = None,
+    limit: int = 50,
+    cursor: str = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Complaints created by the current user, with per-status counts"""
+    return await _read_queue(db, current_user, models.User.complaints_created, status, limit, cursor)
+
+MAX_BATCH_IDS = 200
+
+@router.get("/batch", response_model=List[schemas.Complaint])
+async def read_complaints_batch(
+    ids: List[int] = Query(...),
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Fetch many complaints by id (`?ids=1&ids=2`) in one query"""
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return await crud.get_complaints_by_ids(db, complaint_ids=ids)
 
 @router.put("/{complaint_id}", response_model=schemas.Complaint)
 async def update_complaint(
@@ -53,6 +114,32 @@ async def read_complaint(
         raise HTTPException(status_code=404, detail="Complaint not found")
     return db_complaint
 
+@router.get("/{complaint_id}/detail", response_model=schemas.ComplaintDetail)
+async def read_complaint_detail(
+    complaint_id: int,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Complaint with tags, comments and audit logs in a single request"""
+    db_complaint = await crud.get_complaint_detail(db, complaint_id=complaint_id)
+    if db_complaint is None:
+        raise HTTPException(status_code=404, detail="Complaint not found")
+    return db_complaint
+
+@router.get("/{complaint_id}/similar", response_model=List[schemas.SimilarComplaint])
+async def read_similar_complaints(
+    complaint_id: int,
+    limit: int = similarity.DEFAULT_LIMIT,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    db_complaint = await crud.get_complaint(db, complaint_id=complaint_id)
+    if db_complaint is None:
+        raise HTTPException(status_code=404, detail="Complaint not found")
+    return await similarity.find_similar(
+        db, db_complaint.title, db_complaint.description, exclude_id=complaint_id, limit=min(limit, 50)
+    )
+
 @router.get("/{complaint_id}/audit-logs", response_model=List[schemas.AuditLog])
 async def read_audit_logs(
     complaint_id: int,
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+import os
+import auth, models, profiling
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    tags=["admin-profiles"],
+    responses={404: {"description": "Not found"}},
+)
+
+def _profile_file(profile_id: str, kind: str):
+    path = profiling.profile_path(profile_id, kind)
+    if not profiling.PROFILE_ID_RE.match(profile_id) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return path
+
+@router.get("/")
+async def list_profiles(current_user: models.User = Depends(auth.get_current_admin_user)):
+    """Recent request profiles, newest first (admin only)"""
+    return await run_in_threadpool(profiling.list_profiles)
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str, current_user: models.User = Depends(auth.get_current_admin_user)):
+    """CPU profile in speedscope format; open it at https://www.speedscope.app (admin only)"""
+    return FileResponse(
+        _profile_file(profile_id, "speedscope"),
+        media_type="application/json",
+        filename=f"{profile_id}.speedscope.json",
+    )
+
+@router.get("/{profile_id}/sql")
+async def download_sql_log(profile_id: str, current_user: models.User = Depends(auth.get_current_admin_user)):
+    """SQL statements run by the profiled request with their timings (admin only)"""
+    return FileResponse(_profile_file(profile_id, "sql"), media_type="application/json")
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, timedelta
+from typing import List
+import schemas, database, auth, models, rollups
+
+router = APIRouter(
+    prefix="/reports",
+    tags=["reports"],
+    responses={404: {"description": "Not found"}},
+)
+
+def _date_range(start: date = None, end: date = None):
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return start, end
+
+@router.get("/daily", response_model=List[schemas.DailyReportRow])
+async def daily_report(
+    start: date = None,
+    end: date = None,
+    priority: str = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_admin_user)
+):
+    """Created/resolved per day and mean time to resolve (admin only)"""
+    start, end = _date_range(start, end)
+    return await rollups.get_daily_report(db, start, end, priority=priority)
+
+@router.get("/priorities", response_model=List[schemas.PriorityReportRow])
+async def priority_report(
+    start: date = None,
+    end: date = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_admin_user)
+):
+    """Created/resolved per priority over a date range (admin only)"""
+    start, end = _date_range(start, end)
+    return await rollups.get_priority_report(db, start, end)
+
+@router.get("/tags", response_model=List[schemas.TagReportRow])
+async def tag_report(
+    start: date = None,
+    end: date = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_admin_user)
+):
+    """Created/resolved per tag over a date range (admin only)"""
+    start, end = _date_range(start, end)
+    return await rollups.get_tag_report(db, start, end)
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import schemas, crud, database, auth, models
+
+router = APIRouter(
+    prefix="/saved-searches",
+    tags=["saved-searches"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/", response_model=List[schemas.SavedSearch])
+async def list_saved_searches(
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Current user's saved searches with unseen match counts"""
+    return await crud.get_saved_searches(db, user_id=current_user.id)
+
+@router.post("/", response_model=schemas.SavedSearch)
+async def create_saved_search(
+    saved_search: schemas.SavedSearchCreate,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Save a complaint filter; new and updated complaints matching it are collected"""
+    return await crud.create_saved_search(db, saved_search=saved_search, user_id=current_user.id)
+
+@router.delete("/{saved_search_id}")
+async def delete_saved_search(
+    saved_search_id: int,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    db_saved_search = await crud.delete_saved_search(db, saved_search_id=saved_search_id, user_id=current_user.id)
+    if db_saved_search is None:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return {"message": "Saved search deleted successfully"}
+
+@router.get("/{saved_search_id}/matches", response_model=List[schemas.SavedSearchMatch])
+async def list_matches(
+    saved_search_id: int,
+    unseen_only: bool = True,
+    limit: int = 50,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Complaints that matched the saved search, newest first"""
+    db_saved_search = await crud.get_saved_search(db, saved_search_id=saved_search_id, user_id=current_user.id)
+    if db_saved_search is None:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    return await crud.get_saved_search_matches(db, saved_search_id=saved_search_id, unseen_only=unseen_only, limit=min(limit, 200))
+
+@router.post("/{saved_search_id}/seen")
+async def mark_seen(
+    saved_search_id: int,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Mark all current matches as seen"""
+    db_saved_search = await crud.get_saved_search(db, saved_search_id=saved_search_id, user_id=current_user.id)
+    if db_saved_search is None:
+        raise HTTPException(status_code=404, detail="Saved search not found")
+    await crud.mark_saved_search_seen(db, saved_search_id=saved_search_id)
+    return {"message": "Matches marked as seen"}
@@ -46,7 +46,22 @@ async def delete_tag(
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Delete a tag"""
-    db_tag = await crud.delete_tag(db, tag_id=tag_id)
+    db_tag = await crud.delete_tag(db, tag_id=tag_id, user_id=current_user.id)
     if db_tag is None:
         raise HTTPException(status_code=404, detail="Tag not found")
     return {"message": "Tag deleted successfully"}
+
+@router.post("/{tag_id}/merge", response_model=schemas.TagMergeResult)
+async def merge_tag(
+    tag_id: int,
+    merge: schemas.TagMerge,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Merge a tag into another: its complaints get the target tag and the tag is deleted"""
+    if tag_id == merge.target_tag_id:
+        raise HTTPException(status_code=400, detail="Cannot merge a tag into itself")
+    if await crud.get_tag(db, tag_id=tag_id) is None or await crud.get_tag(db, tag_id=merge.target_tag_id) is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    affected = await crud.merge_tags(db, source_tag_id=tag_id, target_tag_id=merge.target_tag_id, user_id=current_user.id)
+    return {"tag": await crud.get_tag(db, tag_id=merge.target_tag_id), "complaints_affected": affected}
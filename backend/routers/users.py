@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-import schemas, crud, database, auth
+import schemas, crud, database, auth, models, user_directory
 
 router = APIRouter(
     prefix="/users",
@@ -20,6 +20,18 @@ async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(datab
 async def read_users_me(current_user: schemas.User = Depends(auth.get_current_user)):
     return current_user
 
+@router.get("/search", response_model=List[schemas.UserSummary])
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=150),
+    limit: int = Query(10, ge=1, le=50),
+    role: schemas.UserRole = None,
+    db: AsyncSession = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_staff_user)
+):
+    """Active users whose username starts with q, for assignee typeahead (agents and admins)"""
+    await user_directory.username_index.ensure_loaded(db)
+    return user_directory.username_index.search(q, limit, role.value if role else None)
+
 @router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(form_data: schemas.UserCreate, db: AsyncSession = Depends(database.get_db)):
     # Note: In real app, use OAuth2PasswordRequestForm
@@ -30,5 +42,6 @@ async def login_for_access_token(form_data: schemas.UserCreate, db: AsyncSession
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.username})
+    # role lets admission control prioritize staff without a DB lookup
+    access_token = auth.create_access_token(data={"sub": user.username, "role": user.role})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+from collections import defaultdict
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# Saved searches are matched when a complaint is written, not by re-running them.
+# The inverted index maps (status, priority, tag_id) to saved search ids, with None
+# standing for "any". A write only probes the 2 x 2 x (tags + 1) keys its complaint
+# can match, so its cost doesn't grow with the number of saved searches.
+#
+# Each worker keeps its own copy, reloaded after REFRESH_SECONDS to pick up
+# searches created through other workers.
+
+REFRESH_SECONDS = int(os.getenv("SAVED_SEARCH_REFRESH_SECONDS", "30"))
+
+def _value(value):
+    return getattr(value, "value", value)
+
+def _ilike_pattern(search: str):
+    """Regex with the semantics of get_complaints' ILIKE '%search%' (wildcards, escapes, untrimmed)"""
+    parts = []
+    chars = iter(search)
+    for char in chars:
+        if char == "\\":
+            parts.append(re.escape(next(chars, "\\")))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+class SavedSearchIndex:
+    def __init__(self):
+        self.by_key = defaultdict(set)
+        self.searches = {}
+        self.loaded_at = None
+
+    def _key(self, search):
+        return (search["status"], search["priority"], search["tag_id"])
+
+    def add(self, search: dict):
+        self.remove(search["id"])
+        search = dict(search, pattern=_ilike_pattern(search["search"]) if search["search"] else None)
+        self.searches[search["id"]] = search
+        self.by_key[self._key(search)].add(search["id"])
+
+    def remove(self, search_id: int):
+        search = self.searches.pop(search_id, None)
+        if search is not None:
+            key = self._key(search)
+            self.by_key[key].discard(search_id)
+            if not self.by_key[key]:
+                del self.by_key[key]
+
+    def match(self, status: str, priority: str, tag_ids, title: str, description: str):
+        """Ids of saved searches the complaint satisfies"""
+        candidates = set()
+        for status_key in (status, None):
+            for priority_key in (priority, None):
+                for tag_key in (*tag_ids, None):
+                    candidates.update(self.by_key.get((status_key, priority_key, tag_key), ()))
+
+        title, description = title or "", description or ""
+        matched = []
+        for search_id in candidates:
+            pattern = self.searches[search_id]["pattern"]
+            # Title OR description, as in get_complaints
+            if pattern is None or pattern.search(title) or pattern.search(description):
+                matched.append(search_id)
+        return matched
+
+    def invalidate(self):
+        """Force a reload on next use"""
+        self.loaded_at = None
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < REFRESH_SECONDS:
+            return
+        result = await db.execute(select(
+            models.SavedSearch.id,
+            models.SavedSearch.search,
+            models.SavedSearch.status,
+            models.SavedSearch.priority,
+            models.SavedSearch.tag_id,
+        ))
+        self.by_key = defaultdict(set)
+        self.searches = {}
+        for row in result.mappings():
+            self.add(dict(row))
+        self.loaded_at = time.monotonic()
+
+saved_search_index = SavedSearchIndex()
+
+def search_to_dict(saved_search: models.SavedSearch):
+    return {
+        "id": saved_search.id,
+        "search": saved_search.search,
+        "status": saved_search.status,
+        "priority": saved_search.priority,
+        "tag_id": saved_search.tag_id,
+    }
+
+async def _insert_matches(db: AsyncSession, pairs):
+    """Flag (saved search id, complaint id) pairs as new, unseen matches"""
+    if not pairs:
+        return
+    stmt = pg_insert(models.SavedSearchMatch).values(
+        [{"saved_search_id": search_id, "complaint_id": complaint_id, "seen": False} for search_id, complaint_id in pairs]
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["saved_search_id", "complaint_id"],
+        set_={"seen": False, "matched_at": func.now()},
+    ))
+
+async def record_matches(db: AsyncSession, complaint: models.Complaint):
+    """Flag the complaint as a new (unseen) match of every saved search it satisfies; caller commits"""
+    await saved_search_index.ensure_loaded(db)
+    matched = saved_search_index.match(
+        _value(complaint.status),
+        _value(complaint.priority),
+        [tag.id for tag in complaint.tags],
+        complaint.title,
+        complaint.description,
+    )
+    await _insert_matches(db, [(search_id, complaint.id) for search_id in matched])
+
+async def record_matches_for_ids(db: AsyncSession, complaint_ids):
+    """record_matches for complaints changed by a bulk Core update; loads them in one query"""
+    if not complaint_ids:
+        return
+    await saved_search_index.ensure_loaded(db)
+    tag_ids = (
+        select(func.array_agg(models.complaint_tags.c.tag_id))
+        .where(models.complaint_tags.c.complaint_id == models.Complaint.id)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            models.Complaint.id,
+            models.Complaint.status,
+            models.Complaint.priority,
+            models.Complaint.title,
+            models.Complaint.description,
+            tag_ids.label("tag_ids"),
+        ).where(models.Complaint.id.in_(complaint_ids))
+    )
+    pairs = []
+    for row in result:
+        matched = saved_search_index.match(
+            row.status, row.priority, row.tag_ids or [], row.title, row.description
+        )
+        pairs += [(search_id, row.id) for search_id in matched]
+    await _insert_matches(db, pairs)
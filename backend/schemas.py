@@ -1,10 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Dict
+from datetime import date, datetime
 from enum import Enum
 
 class UserRole(str, Enum):
     ADMIN = "admin"
+    AGENT = "agent"
     USER = "user"
 
 class ComplaintStatus(str, Enum):
@@ -25,6 +26,10 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+class UserSummary(BaseModel):
+    id: int
+    username: str
+
 class User(UserBase):
     id: int
     is_active: bool = True
@@ -70,6 +75,13 @@ class Tag(TagBase):
     class Config:
         orm_mode = True
 
+class TagMerge(BaseModel):
+    target_tag_id: int
+
+class TagMergeResult(BaseModel):
+    tag: Tag
+    complaints_affected: int
+
 class Complaint(ComplaintBase):
     id: int
     status: ComplaintStatus
@@ -78,18 +90,34 @@ class Complaint(ComplaintBase):
     assigned_to_id: Optional[int]
     created_at: datetime
     updated_at: Optional[datetime]
+    sla_breached_at: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
     tags: List[Tag] = []
 
     class Config:
         orm_mode = True
 
+class ComplaintQueue(BaseModel):
+    items: List[Complaint]
+    counts: Dict[str, int]
+    next_cursor: Optional[str] = None
+
+class SimilarComplaint(BaseModel):
+    id: int
+    title: str
+    status: ComplaintStatus
+    score: float
+
+class ComplaintWithSimilar(Complaint):
+    similar: List[SimilarComplaint] = []
+
 class AuditLogBase(BaseModel):
     change_description: str
 
 class AuditLog(AuditLogBase):
     id: int
     complaint_id: int
-    changed_by_id: int
+    changed_by_id: Optional[int] = None
     timestamp: datetime
 
     class Config:
@@ -111,6 +139,68 @@ class Comment(CommentBase):
     class Config:
         orm_mode = True
 
+class Attachment(BaseModel):
+    id: int
+    complaint_id: int
+    uploaded_by_id: int
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ComplaintDetail(Complaint):
+    comments: List[Comment] = []
+    audit_logs: List[AuditLog] = []
+
+# Saved search schemas
+class SavedSearchCreate(BaseModel):
+    name: str
+    search: Optional[str] = None
+    status: Optional[ComplaintStatus] = None
+    priority: Optional[ComplaintPriority] = None
+    tag_id: Optional[int] = None
+
+class SavedSearch(SavedSearchCreate):
+    id: int
+    user_id: int
+    created_at: datetime
+    unseen_count: int = 0
+
+    class Config:
+        orm_mode = True
+
+class SavedSearchMatch(BaseModel):
+    complaint_id: int
+    title: str
+    status: ComplaintStatus
+    priority: ComplaintPriority
+    matched_at: datetime
+    seen: bool
+
+# Reporting schemas
+class DailyReportRow(BaseModel):
+    day: date
+    created: int
+    resolved: int
+    mean_hours_to_resolve: Optional[float] = None
+
+class PriorityReportRow(BaseModel):
+    priority: str
+    created: int
+    resolved: int
+    mean_hours_to_resolve: Optional[float] = None
+
+class TagReportRow(BaseModel):
+    tag_id: int
+    tag_name: str
+    created: int
+    resolved: int
+    mean_hours_to_resolve: Optional[float] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -126,3 +216,6 @@ class UserUpdate(BaseModel):
 
 class PasswordReset(BaseModel):
     new_password: str
+
+class AgentSkills(BaseModel):
+    tag_ids: List[int]
@@ -0,0 +1,94 @@
+import hashlib
+import re
+import struct
+from sqlalchemy import select, delete, insert, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# MinHash signature split into bands for locality-sensitive hashing.
+# Two complaints with Jaccard similarity s share at least one band with
+# probability 1 - (1 - s^ROWS_PER_BAND)^NUM_BANDS (~0.5 at s=0.5, ~0.99 at s=0.8).
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_HASHES = NUM_BANDS * ROWS_PER_BAND
+MIN_SHARED_BANDS = 2
+DEFAULT_LIMIT = 5
+
+_HASH_FORMAT = struct.Struct(f"<{NUM_HASHES}I")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def shingles(text: str):
+    """Word unigrams and bigrams of the normalized text"""
+    words = _WORD_RE.findall(text.lower())
+    grams = set(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return grams
+
+def minhash_signature(text: str):
+    grams = shingles(text)
+    if not grams:
+        return None
+    # One SHAKE digest per shingle yields NUM_HASHES independent 32-bit hashes;
+    # the column-wise minimum is the MinHash signature. Deterministic across processes.
+    hashed = [_HASH_FORMAT.unpack(hashlib.shake_128(g.encode()).digest(_HASH_FORMAT.size)) for g in grams]
+    return list(map(min, zip(*hashed)))
+
+def band_buckets(signature):
+    """One signed 64-bit bucket key per band"""
+    buckets = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "big", signed=True))
+    return buckets
+
+def complaint_text(title: str, description: str):
+    return f"{title or ''} {description or ''}"
+
+def complaint_buckets(title: str, description: str):
+    signature = minhash_signature(complaint_text(title, description))
+    return band_buckets(signature) if signature else []
+
+async def index_complaint(db: AsyncSession, complaint_id: int, title: str, description: str):
+    """Replace the LSH buckets of one complaint; caller commits"""
+    await db.execute(delete(models.ComplaintLSHBucket).where(models.ComplaintLSHBucket.complaint_id == complaint_id))
+    buckets = complaint_buckets(title, description)
+    if buckets:
+        await db.execute(
+            insert(models.ComplaintLSHBucket),
+            [{"complaint_id": complaint_id, "band": band, "bucket": bucket} for band, bucket in enumerate(buckets)],
+        )
+
+async def find_similar(db: AsyncSession, title: str, description: str, exclude_id: int = None, limit: int = DEFAULT_LIMIT):
+    """Likely duplicates ranked by the number of shared LSH bands.
+
+    Only rows in matching (band, bucket) pairs are touched, so the cost depends on
+    the number of near neighbours rather than the size of the complaints table.
+    """
+    buckets = complaint_buckets(title, description)
+    if not buckets:
+        return []
+
+    shared = func.count().label("shared")
+    query = (
+        select(models.ComplaintLSHBucket.complaint_id, shared)
+        .where(tuple_(models.ComplaintLSHBucket.band, models.ComplaintLSHBucket.bucket).in_(list(enumerate(buckets))))
+        .group_by(models.ComplaintLSHBucket.complaint_id)
+        .having(shared >= MIN_SHARED_BANDS)
+        .order_by(shared.desc(), models.ComplaintLSHBucket.complaint_id.desc())
+        .limit(limit)
+    )
+    if exclude_id is not None:
+        query = query.where(models.ComplaintLSHBucket.complaint_id != exclude_id)
+    matches = (await db.execute(query)).all()
+    if not matches:
+        return []
+
+    scores = {complaint_id: count / NUM_BANDS for complaint_id, count in matches}
+    result = await db.execute(
+        select(models.Complaint.id, models.Complaint.title, models.Complaint.status)
+        .where(models.Complaint.id.in_(scores))
+    )
+    similar = [{"id": row.id, "title": row.title, "status": row.status, "score": scores[row.id]} for row in result]
+    similar.sort(key=lambda item: (-item["score"], -item["id"]))
+    return similar
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from sqlalchemy import select, update, insert, text, func
+from database import engine
+import models, cache, rollups, saved_searches
+
+logger = logging.getLogger(__name__)
+
+# Hours a complaint may stay open/in progress before it breaches its SLA
+SLA_HOURS = {
+    models.ComplaintPriority.CRITICAL.value: float(os.getenv("SLA_HOURS_CRITICAL", "4")),
+    models.ComplaintPriority.HIGH.value: float(os.getenv("SLA_HOURS_HIGH", "24")),
+    models.ComplaintPriority.MEDIUM.value: float(os.getenv("SLA_HOURS_MEDIUM", "72")),
+    models.ComplaintPriority.LOW.value: float(os.getenv("SLA_HOURS_LOW", "168")),
+}
+
+# Breaching complaints move up one priority level; critical ones are only flagged
+ESCALATION = {
+    models.ComplaintPriority.LOW.value: models.ComplaintPriority.MEDIUM.value,
+    models.ComplaintPriority.MEDIUM.value: models.ComplaintPriority.HIGH.value,
+    models.ComplaintPriority.HIGH.value: models.ComplaintPriority.CRITICAL.value,
+    models.ComplaintPriority.CRITICAL.value: models.ComplaintPriority.CRITICAL.value,
+}
+
+SLA_CHECK_INTERVAL_SECONDS = int(os.getenv("SLA_CHECK_INTERVAL_SECONDS", "300"))
+SLA_BATCH_SIZE = int(os.getenv("SLA_BATCH_SIZE", "500"))
+SLA_SCHEDULER_ENABLED = os.getenv("SLA_SCHEDULER_ENABLED", "1") == "1"
+
+# pg advisory lock key; only the worker holding it runs a pass
+SLA_LOCK_KEY = 270001
+
+ACTIVE_STATUSES = [models.ComplaintStatus.OPEN.value, models.ComplaintStatus.IN_PROGRESS.value]
+
+# Every complaint carries sla_due_at = created_at + SLA_HOURS[priority], recomputed
+# whenever its priority changes. A pass escalates the active, unflagged complaints
+# that are due; the partial index on sla_due_at holds exactly those candidates, so a
+# complaint raised to critical late or reopened after its deadline is caught by the
+# next pass without scanning anything else.
+
+def due_in(priority) -> timedelta:
+    """Time allowed from creation for a complaint of this priority"""
+    priority = getattr(priority, "value", priority) or models.ComplaintPriority.MEDIUM.value
+    return timedelta(hours=SLA_HOURS.get(priority, SLA_HOURS[models.ComplaintPriority.MEDIUM.value]))
+
+def due_at_sql(created_at: str = "created_at", priority: str = "priority"):
+    """SQL equivalent of created_at + due_in(priority), for backfills"""
+    cases = " ".join(f"WHEN '{name}' THEN interval '{hours} hours'" for name, hours in SLA_HOURS.items())
+    default = SLA_HOURS[models.ComplaintPriority.MEDIUM.value]
+    return f"{created_at} + CASE {priority} {cases} ELSE interval '{default} hours' END"
+
+async def _escalate(conn, priority: str, rows, now):
+    """Escalate one priority's share of a batch; returns the rows actually changed"""
+    new_priority = ESCALATION[priority]
+    # Guarded on the scanned state: a concurrent edit of priority wins over escalation
+    result = await conn.execute(
+        update(models.Complaint)
+        .where(
+            models.Complaint.id.in_([row.id for row in rows]),
+            models.Complaint.priority == priority,
+            models.Complaint.status.in_(ACTIVE_STATUSES),
+            models.Complaint.sla_breached_at.is_(None),
+        )
+        .values(
+            priority=new_priority,
+            sla_breached_at=now,
+            sla_due_at=models.Complaint.created_at + due_in(new_priority),
+        )
+        .returning(models.Complaint.id, models.Complaint.created_at)
+    )
+    escalated = result.all()
+    if not escalated:
+        return escalated
+
+    # Only open complaints are escalated, so just their creation counts move
+    await rollups.record_reclassified(conn, [
+        rollups.Reclassification(row.created_at, None, priority, new_priority) for row in escalated
+    ])
+    if new_priority != priority:
+        description = f"SLA breached: priority escalated from {priority} to {new_priority}"
+    else:
+        description = f"SLA breached: {priority} complaint open longer than {SLA_HOURS[priority]:g}h"
+    await conn.execute(
+        insert(models.AuditLog),
+        [{"complaint_id": row.id, "changed_by_id": None, "change_description": description} for row in escalated],
+    )
+    return escalated
+
+async def _escalate_batch(conn, now):
+    """Escalate up to SLA_BATCH_SIZE due complaints; returns (scanned, escalated)"""
+    rows = (await conn.execute(
+        select(models.Complaint.id, models.Complaint.priority)
+        .where(
+            models.Complaint.status.in_(ACTIVE_STATUSES),
+            models.Complaint.sla_breached_at.is_(None),
+            models.Complaint.sla_due_at <= now,
+        )
+        .order_by(models.Complaint.sla_due_at)
+        .limit(SLA_BATCH_SIZE)
+    )).all()
+    if not rows:
+        return 0, 0
+
+    by_priority = {}
+    for row in rows:
+        by_priority.setdefault(row.priority, []).append(row)
+    escalated = []
+    for priority, priority_rows in by_priority.items():
+        if priority in ESCALATION:
+            escalated += await _escalate(conn, priority, priority_rows, now)
+    # Escalated complaints may now satisfy saved searches on the new priority
+    await saved_searches.record_matches_for_ids(conn, [row.id for row in escalated])
+    await conn.commit()
+    await cache.invalidate_complaint_lists()
+    return len(rows), len(escalated)
+
+async def run_sla_check():
+    """Escalate complaints that are past their SLA due time.
+
+    Returns the number of complaints escalated, or None if another worker holds the lock.
+    """
+    async with engine.connect() as conn:
+        locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": SLA_LOCK_KEY})).scalar()
+        await conn.commit()
+        if not locked:
+            return None
+        try:
+            now = (await conn.execute(select(func.now()))).scalar()
+            escalated = 0
+            while True:
+                scanned, count = await _escalate_batch(conn, now)
+                escalated += count
+                # A batch whose rows were all changed concurrently escalates nothing;
+                # stop rather than rescan them until the next pass
+                if scanned < SLA_BATCH_SIZE or count == 0:
+                    break
+            return escalated
+        finally:
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SLA_LOCK_KEY})
+            await conn.commit()
+
+async def sla_scheduler():
+    """Background loop started by the app; safe to run in every worker"""
+    while True:
+        try:
+            escalated = await run_sla_check()
+            if escalated:
+                logger.info("SLA check escalated %d complaints", escalated)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("SLA check failed")
+        await asyncio.sleep(SLA_CHECK_INTERVAL_SECONDS)
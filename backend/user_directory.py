@@ -0,0 +1,78 @@
+import bisect
+import os
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+
+# Username typeahead served from memory.
+#
+# Active users are kept in an array sorted by lowercased username, so a prefix
+# lookup is a bisect to the first candidate plus a scan of at most `limit`
+# entries. crud keeps the array in sync on user writes; each worker also
+# reloads it after REFRESH_SECONDS to pick up writes made through other workers.
+
+REFRESH_SECONDS = int(os.getenv("USER_DIRECTORY_REFRESH_SECONDS", "60"))
+
+def _value(value):
+    return getattr(value, "value", value)
+
+class UsernameIndex:
+    def __init__(self):
+        self.entries = []  # (lowercased username, id, username, role), sorted
+        self.by_id = {}
+        self.loaded_at = None
+
+    def reset(self, users):
+        """Replace all state from (id, username, role) tuples of active users"""
+        self.by_id = {user_id: (username.lower(), user_id, username, _value(role)) for user_id, username, role in users}
+        self.entries = sorted(self.by_id.values())
+
+    def add(self, user_id: int, username: str, role):
+        self.remove(user_id)
+        entry = (username.lower(), user_id, username, _value(role))
+        self.by_id[user_id] = entry
+        bisect.insort(self.entries, entry)
+
+    def remove(self, user_id: int):
+        entry = self.by_id.pop(user_id, None)
+        if entry is not None:
+            index = bisect.bisect_left(self.entries, entry)
+            if index < len(self.entries) and self.entries[index] == entry:
+                del self.entries[index]
+
+    def sync(self, user: models.User):
+        """Apply a created or updated user: index it if active, drop it otherwise"""
+        if user.is_active and user.username:
+            self.add(user.id, user.username, user.role)
+        else:
+            self.remove(user.id)
+
+    def search(self, prefix: str, limit: int, role: str = None):
+        prefix = prefix.lower()
+        matches = []
+        for index in range(bisect.bisect_left(self.entries, (prefix,)), len(self.entries)):
+            key, user_id, username, user_role = self.entries[index]
+            if not key.startswith(prefix):
+                break
+            if role is None or user_role == role:
+                matches.append({"id": user_id, "username": username})
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def invalidate(self):
+        """Force a reload on next use"""
+        self.loaded_at = None
+
+    async def ensure_loaded(self, db: AsyncSession):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < REFRESH_SECONDS:
+            return
+        result = await db.execute(
+            select(models.User.id, models.User.username, models.User.role)
+            .where(models.User.is_active.is_(True), models.User.username.isnot(None))
+        )
+        self.reset(result.all())
+        self.loaded_at = time.monotonic()
+
+username_index = UsernameIndex()
@@ -18,14 +18,11 @@ const ComplaintDetail = () => {
 
     const fetchData = async () => {
         try {
-            const [complaintRes, auditRes, commentsRes] = await Promise.all([
-                api.get(`/complaints/${id}`),
-                api.get(`/complaints/${id}/audit-logs`),
-                api.get(`/complaints/${id}/comments`)
-            ]);
-            setComplaint(complaintRes.data);
-            setAuditLogs(auditRes.data);
-            setComments(commentsRes.data);
+            const { data } = await api.get(`/complaints/${id}/detail`);
+            const { comments, audit_logs, ...complaintData } = data;
+            setComplaint(complaintData);
+            setAuditLogs(audit_logs);
+            setComments(comments);
         } catch (error) {
             console.error('Error fetching data:', error);
         } finally {
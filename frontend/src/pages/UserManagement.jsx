@@ -222,6 +222,7 @@ const UserManagement = () => {
                                         onChange={(e) => setFormData({ ...formData, role: e.target.value })}
                                     >
                                         <option value="user">User</option>
+                                        <option value="agent">Agent</option>
                                         <option value="admin">Admin</option>
                                     </select>
                                 </div>
@@ -266,6 +267,7 @@ const UserManagement = () => {
                                         onChange={(e) => setFormData({ ...formData, role: e.target.value })}
                                     >
                                         <option value="user">User</option>
+                                        <option value="agent">Agent</option>
                                         <option value="admin">Admin</option>
                                     </select>
                                 </div>